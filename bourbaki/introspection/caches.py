@@ -0,0 +1,405 @@
+# coding:utf-8
+import typing
+import types
+import collections.abc
+from collections import OrderedDict, namedtuple
+import sys
+from functools import partial, update_wrapper
+from threading import Event, RLock, get_ident
+from types import MethodType
+from weakref import ref
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+CacheStats = namedtuple(
+    "CacheStats", ["name", "hits", "misses", "maxsize", "currsize", "nbytes"]
+)
+
+# Py_TPFLAGS_HEAPTYPE; classes without this flag are statically allocated and are never garbage collected
+_HEAPTYPE = 1 << 9
+
+# markers for the structural parts of keys, so that these can't collide with plain tuple args
+_alias_mark = object()
+_kwd_mark = object()
+_missing = object()
+
+# generic aliases whose equality is determined by their type, origin and args alone
+_alias_types = frozenset(
+    (
+        typing._GenericAlias,
+        typing._UnionGenericAlias,
+        typing._CallableGenericAlias,
+        types.GenericAlias,
+        types.UnionType,
+        type(collections.abc.Callable[[int], int]),
+    )
+)
+
+# objects that compare by identity and may be created dynamically
+_weakly_keyed_types = (type, types.FunctionType, typing.NewType)
+
+
+def _weak_key(obj):
+    """A hashable key comparing equal to the key for any object equal to `obj`, in which any dynamically created
+    classes, functions and NewTypes in the structure of `obj` are replaced by weak references
+    """
+    t = type(obj)
+    if t is type:
+        return ref(obj) if obj.__flags__ & _HEAPTYPE else obj
+    if t is tuple:
+        return tuple([_weak_key(o) for o in obj])
+    if isinstance(obj, _weakly_keyed_types):
+        if isinstance(obj, type) and not obj.__flags__ & _HEAPTYPE:
+            return obj
+        return ref(obj)
+    if t in _alias_types:
+        # memoized by identity; hashing deeply nested aliases is expensive
+        entry = _alias_keys.get(id(obj))
+        if entry is not None and entry[0]() is obj:
+            return entry[1]
+        key = _alias_key(obj, t)
+        try:
+            _alias_keys[id(obj)] = (ref(obj, partial(_forget_alias_key, id(obj))), key)
+        except TypeError:
+            # types.UnionType isn't weak-referenceable
+            pass
+        return key
+    if t is not list and isinstance(obj, list) and t.__hash__ is not None:
+        # hashable list subclasses, e.g. CallableSignature
+        return (t, *map(_weak_key, obj))
+    return obj
+
+
+class _HashedKey(list):
+    """structural key of a generic alias with its hash computed once, as for functools' _HashedSeq; keys of nested
+    aliases are hashed in constant time on every cache probe, rather than recursively"""
+
+    __slots__ = ("hashvalue",)
+
+    def __init__(self, key: tuple):
+        self[:] = key
+        self.hashvalue = hash(key)
+
+    def __hash__(self):
+        return self.hashvalue
+
+
+def _alias_key(alias, t):
+    # always decomposed, even when no weak refs are needed, since tuples of types hash much faster than aliases
+    origin = getattr(alias, "__origin__", None)
+    return _HashedKey((_alias_mark, t, _weak_key(origin), _weak_key(alias.__args__)))
+
+
+# id of generic alias -> (weak ref to it, its key)
+_alias_keys = {}
+
+
+def _forget_alias_key(id_, weakref):
+    entry = _alias_keys.get(id_)
+    if entry is not None and entry[0] is weakref:
+        del _alias_keys[id_]
+
+
+def _referents(key):
+    """the live objects weakly referenced in a key constructed by _weak_key"""
+    t = type(key)
+    if t is ref:
+        obj = key()
+        return () if obj is None else (obj,)
+    if t is tuple or t is _HashedKey:
+        return tuple(obj for k in key for obj in _referents(k))
+    return ()
+
+
+class WeakLRUCache:
+    """Memoizes a function of hashable args as functools.lru_cache does, but with weak references to any classes,
+    functions and NewTypes appearing in the args (or in the structure of generic aliases or tuples in the args), so
+    that caching doesn't prevent them from being garbage collected; entries involving them are dropped when they are.
+    Note that this can't help when the cached value itself references the same objects (e.g. a type checker for a
+    class); such entries keep their classes alive until evicted, so only `maxsize` limits what they retain.
+    If `maxsize` is not None, the least recently used entries are evicted to keep the cache within that size.
+    If `clearable` is False, clear_caches() leaves the cache alone, for caches whose values must stay identical for
+    the same args (e.g. dynamically created classes). Lookups take no locks. On a miss, concurrent callers with the same args wait for the first to compute the value
+    rather than computing it again; no lock is held while `func` runs, so mutually recursive caches can't deadlock.
+    """
+
+    def __init__(
+        self,
+        func: typing.Callable,
+        maxsize: typing.Optional[int] = None,
+        weak=True,
+        clearable=True,
+    ):
+        self.func = func
+        self.maxsize = maxsize
+        self.weak = weak
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        # id of referent -> (weak ref with callback, set of keys referencing it)
+        self._dependents = {}
+        # key -> ids of its referents
+        self._key_referents = {}
+        # (id, weak ref) pairs for collected referents whose entries haven't been removed yet
+        self._pending = []
+        # guards all mutation; key -> (thread id, Event) for values being computed
+        self._lock = RLock()
+        self._inflight = {}
+        update_wrapper(self, func)
+        register_cache(
+            self,
+            "{}.{}".format(func.__module__, getattr(func, "__qualname__", func)),
+            clearable=clearable,
+        )
+
+    def __get__(self, obj, cls):
+        # allow use as a method decorator, like functools.lru_cache
+        if obj is None:
+            return self
+        return MethodType(self, obj)
+
+    def __call__(self, *args, **kwargs):
+        key = (*args, _kwd_mark, *kwargs.items()) if kwargs else args
+        if self.weak:
+            key = tuple([_weak_key(a) for a in key])
+        data = self._data
+        value = data.get(key, _missing)
+        if value is not _missing:
+            self.hits += 1
+            if self.maxsize is not None:
+                try:
+                    data.move_to_end(key)
+                except KeyError:
+                    # evicted concurrently
+                    pass
+            return value
+        return self._miss(key, args, kwargs)
+
+    def _miss(self, key, args, kwargs):
+        thread = get_ident()
+        with self._lock:
+            value = self._data.get(key, _missing)
+            if value is not _missing:
+                self.hits += 1
+                return value
+            self.misses += 1
+            inflight = self._inflight.get(key)
+            if inflight is None or inflight[0] == thread:
+                # nobody else is computing this, or it's a recursive call in this thread
+                inflight = self._inflight[key] = (thread, Event())
+                computing = True
+            else:
+                computing = False
+
+        if not computing:
+            inflight[1].wait()
+            value = self._data.get(key, _missing)
+            if value is not _missing:
+                return value
+            # the computation failed or the entry was already evicted; compute it here
+            return self.func(*args, **kwargs)
+
+        try:
+            value = self.func(*args, **kwargs)
+            with self._lock:
+                self._insert(key, value)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+            inflight[1].set()
+        return value
+
+    def _insert(self, key, value):
+        if self._pending:
+            self._purge()
+        data = self._data
+        if key in data:
+            # inserted by a recursive call
+            data[key] = value
+            return
+        data[key] = value
+        referents = _referents(key) if self.weak else ()
+        if referents:
+            self._watch(key, referents)
+        maxsize = self.maxsize
+        if maxsize is not None:
+            while len(data) > maxsize:
+                self._unwatch(data.popitem(last=False)[0])
+
+    def _watch(self, key, referents):
+        dependents = self._dependents
+        ids = []
+        for obj in referents:
+            id_ = id(obj)
+            entry = dependents.get(id_)
+            if entry is None or entry[0]() is not obj:
+                entry = dependents[id_] = (
+                    ref(obj, partial(self._collected, id_)),
+                    set(),
+                )
+            entry[1].add(key)
+            ids.append(id_)
+        self._key_referents[key] = ids
+
+    def _unwatch(self, key):
+        dependents = self._dependents
+        for id_ in self._key_referents.pop(key, ()):
+            entry = dependents.get(id_)
+            if entry is not None:
+                entry[1].discard(key)
+                if not entry[1]:
+                    del dependents[id_]
+
+    def _collected(self, id_, weakref):
+        # this may be called at any point during garbage collection; defer the actual removal
+        self._pending.append((id_, weakref))
+
+    def _purge(self):
+        pending = self._pending
+        dependents = self._dependents
+        while pending:
+            id_, weakref = pending.pop()
+            entry = dependents.get(id_)
+            if entry is None or entry[0] is not weakref:
+                # already evicted, or the id has since been reused
+                continue
+            del dependents[id_]
+            for key in entry[1]:
+                self._data.pop(key, None)
+                self._unwatch(key)
+
+    def __bool__(self):
+        # a function, not a container, even when empty
+        return True
+
+    def __reduce__(self):
+        # pickle by reference, as for the function it wraps
+        return self.__qualname__
+
+    def __len__(self):
+        if self._pending:
+            with self._lock:
+                self._purge()
+        return len(self._data)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
+
+    def cache_clear(self):
+        with self._lock:
+            self._data.clear()
+            self._dependents.clear()
+            self._key_referents.clear()
+            self._pending.clear()
+            self.hits = self.misses = 0
+
+    def resize(self, maxsize: typing.Optional[int]):
+        """set a new size bound, evicting least recently used entries as necessary"""
+        with self._lock:
+            self.maxsize = maxsize
+            if maxsize is not None:
+                while len(self._data) > maxsize:
+                    self._unwatch(self._data.popitem(last=False)[0])
+
+    def cache_mappings(self):
+        return (self._data,)
+
+    def __repr__(self):
+        return "{}({!r}, maxsize={!r}, weak={!r})".format(
+            type(self).__name__, self.func, self.maxsize, self.weak
+        )
+
+
+def weak_lru_cache(
+    maxsize: typing.Optional[int] = None, weak: bool = True, clearable: bool = True
+):
+    """decorator version of WeakLRUCache"""
+
+    def dec(f):
+        return WeakLRUCache(f, maxsize, weak, clearable)
+
+    return dec
+
+
+# Registry
+
+# id of cache -> (name, weak ref to cache, whether clear_caches() clears it)
+_registry = {}
+
+
+def register_cache(cache, name: typing.Optional[str] = None, clearable: bool = True):
+    """Add a cache to the global registry, so that it's included in cache_stats(), clear_caches() and
+    resize_caches(). `cache` should have methods `cache_info() -> CacheInfo`, `cache_clear()` and
+    `cache_mappings()`, returning the dicts holding its entries, and optionally `resize(maxsize)`.
+    Caches registered with `clearable=False` are skipped by clear_caches(), though they can still be cleared
+    individually. Caches are held weakly; they're dropped from the registry when garbage collected.
+    """
+    id_ = id(cache)
+    if name is None:
+        name = getattr(cache, "__name__", repr(cache))
+    _registry[id_] = (name, ref(cache, partial(_unregister_cache, id_)), clearable)
+    return cache
+
+
+def _unregister_cache(id_, weakref):
+    entry = _registry.get(id_)
+    if entry is not None and entry[1] is weakref:
+        del _registry[id_]
+
+
+def registered_caches() -> typing.List[typing.Tuple[str, typing.Any]]:
+    """(name, cache) pairs for all live registered caches, in order of registration"""
+    caches = ((name, r()) for name, r, _ in list(_registry.values()))
+    return [(name, cache) for name, cache in caches if cache is not None]
+
+
+def approx_nbytes(cache) -> int:
+    """Approximate bytes retained by a cache: the sizes of its mappings and of the tuple structure of its keys, plus
+    the shallow sizes of its values. Objects appearing in keys (e.g. classes) are not counted, since these are
+    generally owned elsewhere."""
+    nbytes = 0
+    for mapping in cache.cache_mappings():
+        nbytes += sys.getsizeof(mapping)
+        for key, value in list(mapping.items()):
+            nbytes += _tuple_nbytes(key) + _tuple_nbytes(value, sys.getsizeof)
+    return nbytes
+
+
+def _tuple_nbytes(obj, leaf_nbytes=lambda obj: 0):
+    if type(obj) is tuple or type(obj) is _HashedKey:
+        return sys.getsizeof(obj) + sum(_tuple_nbytes(o, leaf_nbytes) for o in obj)
+    if type(obj) is ref:
+        return sys.getsizeof(obj)
+    return leaf_nbytes(obj)
+
+
+def cache_stats() -> typing.List[CacheStats]:
+    """statistics for all registered caches"""
+    stats = []
+    for name, cache in registered_caches():
+        info = cache.cache_info()
+        stats.append(CacheStats(name, *info, approx_nbytes(cache)))
+    return stats
+
+
+def clear_caches():
+    """clear all registered caches, except those registered as not clearable"""
+    for _, r, clearable in list(_registry.values()):
+        cache = r()
+        if cache is not None and clearable:
+            cache.cache_clear()
+
+
+def resize_caches(
+    maxsize: typing.Optional[int] = None, *, factor: typing.Optional[float] = None
+):
+    """Resize all bounded registered caches, either to `maxsize` or by scaling their current bounds by `factor`.
+    Unbounded caches are left alone; some are unbounded by necessity (e.g. where eviction would break class
+    identity), and can be resized individually if desired."""
+    if (maxsize is None) == (factor is None):
+        raise ValueError("exactly one of maxsize or factor must be specified")
+    for _, cache in registered_caches():
+        resize = getattr(cache, "resize", None)
+        current = cache.cache_info().maxsize
+        if resize is None or current is None:
+            continue
+        resize(maxsize if factor is None else max(1, int(current * factor)))
@@ -14,7 +14,7 @@ from typing import (
 from abc import ABCMeta, abstractmethod
 from collections import OrderedDict
 from collections.abc import Mapping as MappingABC
-from functools import lru_cache, singledispatch, update_wrapper
+from functools import singledispatch, update_wrapper
 import functools
 from inspect import Signature, Parameter, BoundArguments
 from itertools import chain
@@ -22,6 +22,7 @@ from operator import itemgetter
 from types import MappingProxyType
 from multipledispatch import dispatch
 from typing_inspect import is_generic_type
+from .caches import weak_lru_cache
 from .types import get_generic_params, fully_concretize_type
 from .classes import most_specific_constructor
 from .utils import is_prefix, is_suffix, name_of, signature
@@ -152,12 +153,12 @@ def fully_concrete_signature(
     f: Callable, from_method: bool = False, tvar_map: Optional[Mapping] = None
 ):
     if tvar_map is not None:
-        # for lru_cache on _fully_concrete_signature helper
+        # for caching on _fully_concrete_signature helper
         tvar_map = tuple(tvar_map.items())
     return _fully_concrete_signature(f, from_method, tvar_map)
 
 
-@lru_cache(None)
+@weak_lru_cache(maxsize=2**12)
 def _fully_concrete_signature(
     f: Callable, from_method: bool = False, tvar_map: Optional[Tuple] = None
 ):
@@ -8,13 +8,26 @@ from typing import (
     Type,
     Union,
     Optional,
+    Set,
     Generic,
     Any,
 )
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import os
 import re
+import sys
 from tempfile import mktemp
+from threading import RLock
+from warnings import warn
+from functools import partial
 from itertools import chain, combinations
+from .caches import CacheInfo, register_cache
+from .classes import parameterized_classpath
 from .debug import DEBUG
+from .imports import import_object
 from .wrappers import const
 from .utils import name_of
 from .types import (
@@ -22,12 +35,16 @@ from .types import (
     deconstruct_generic,
     reconstruct_generic,
     to_type_alias,
-    reparameterized_bases,
+    generic_mro,
     get_generic_origin,
     get_generic_args,
     is_generic_type,
+    to_concrete_type,
+    intern_type,
 )
+from .types.compat import CallableSignature
 
+NoneType = type(None)
 Signature = Tuple[type, ...]
 
 
@@ -53,6 +70,148 @@ def refines(sig1: Signature, sig2: Signature) -> bool:
     )
 
 
+def _refines_or_unrelated(sig1: Signature, sig2: Signature) -> bool:
+    """refines, taking signatures which it can't compare (e.g. involving NewTypes, TypeVars or forward refs) as
+    unrelated, so that they may still be registered and resolved exactly"""
+    try:
+        return refines(sig1, sig2)
+    except Exception:
+        return False
+
+
+def _nominal_class(t) -> Optional[type]:
+    """The class `cls` such that any type refining `t` must have `cls` in the MRO of its origin, for registered types
+    whose origin's metaclass is plain `type` (so that issubclass is purely nominal), or else None"""
+    cls = to_concrete_type(get_generic_origin(t))
+    return cls if type(cls) is type else None
+
+
+def _query_mro(t) -> Optional[Tuple[type, ...]]:
+    """the MRO of the origin of `t`, when this constrains what `t` may refine, else None"""
+    cls = to_concrete_type(get_generic_origin(t))
+    return cls.__mro__ if isinstance(cls, type) else None
+
+
+def _snapshot_staleness(dispatcher, snapshot: dict) -> Optional[str]:
+    if snapshot.get("dispatcher") != dispatcher.__name__:
+        return "snapshot is for dispatcher {!r}".format(snapshot.get("dispatcher"))
+    python = "{}.{}".format(*sys.version_info[:2])
+    if snapshot.get("python") != python:
+        return "snapshot is for python {}; this is python {}".format(
+            snapshot.get("python"), python
+        )
+    if snapshot.get("signatures") != list(map(repr, dispatcher.funcs)):
+        return "the registered signatures have changed"
+    for package, version in snapshot.get("versions", {}).items():
+        current = _package_version(package)
+        if current != version:
+            return "package {} has version {}; the snapshot is for version {}".format(
+                package, current, version
+            )
+    return None
+
+
+def _package_version(package: str) -> Optional[str]:
+    """The versions of the distributions providing the top-level `package`, or for packages not installed from a
+    distribution (e.g. application code), a fingerprint of the modification times and sizes of its files
+    """
+    versions = []
+    for dist in sorted(set(_package_distributions().get(package, ()))):
+        try:
+            versions.append("{}=={}".format(dist, importlib.metadata.version(dist)))
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    if versions:
+        return ", ".join(versions)
+    return _source_fingerprint(package)
+
+
+_packages_distributions = None
+
+
+def _package_distributions() -> Dict[str, List[str]]:
+    # import names aren't distribution names (e.g. yaml is provided by PyYAML); this scans all installed
+    # distributions, so is done once
+    global _packages_distributions
+    if _packages_distributions is None:
+        _packages_distributions = importlib.metadata.packages_distributions()
+    return _packages_distributions
+
+
+def _source_fingerprint(package: str) -> Optional[str]:
+    try:
+        spec = importlib.util.find_spec(package)
+    except (ImportError, ValueError):
+        return None
+    if spec is None:
+        return None
+    if spec.submodule_search_locations:
+        paths = [
+            os.path.join(root, name)
+            for location in spec.submodule_search_locations
+            for root, _, names in os.walk(location)
+            for name in names
+            if not name.endswith(".pyc")
+        ]
+    elif spec.has_location:
+        paths = [spec.origin]
+    else:
+        return None
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update("{}:{}:{};".format(path, stat.st_mtime_ns, stat.st_size).encode())
+    return "files:" + digest.hexdigest()
+
+
+def _encode_type(t, packages: Set[str]):
+    """Encode a type in JSON-serializable form: classes and other importable type objects as their import paths,
+    and generics as lists of their deconstructed origin and args. Top-level packages are collected in `packages`."""
+    if get_generic_args(t):
+        return _encode_type_tree(deconstruct_generic(t), packages)
+    return _encode_type_leaf(t, packages)
+
+
+def _encode_type_tree(tree, packages: Set[str]):
+    if isinstance(tree, tuple):
+        return [_encode_type_tree(t, packages) for t in tree]
+    if isinstance(tree, list):
+        # callable signature
+        return dict(args=[_encode_type_tree(t, packages) for t in tree])
+    return _encode_type_leaf(tree, packages)
+
+
+def _encode_type_leaf(t, packages: Set[str]):
+    if t is Ellipsis:
+        return "..."
+    if t is None or t is NoneType:
+        return None
+    path = "{}.{}".format(t.__module__, t.__qualname__)
+    if import_object(path) is not t:
+        raise TypeError("{} can't be imported from its path {}".format(t, path))
+    packages.add(t.__module__.split(".")[0])
+    return path
+
+
+def _decode_type(encoded):
+    if encoded is None:
+        return NoneType
+    if isinstance(encoded, str):
+        return import_object(encoded)
+    return reconstruct_generic(_decode_type_tree(encoded))
+
+
+def _decode_type_tree(encoded):
+    if isinstance(encoded, dict):
+        return CallableSignature(map(_decode_type_tree, encoded["args"]))
+    if isinstance(encoded, list):
+        return tuple(map(_decode_type_tree, encoded))
+    return _decode_type(encoded)
+
+
 def verbose_call(f):  # pragma: no cover (debug)
     def verbose_f(*args):
         result = f(*args)
@@ -73,6 +232,44 @@ def type_str(t):
 # Dispatchers
 
 
+class SignatureDAG:
+    """The transitively reduced refinement DAG on the signatures registered with a dispatcher, with an edge from each
+    signature to each of the most specific signatures it refines. Provides the parts of the networkx.DiGraph
+    interface needed for visualization; call to_networkx() for the rest."""
+
+    def __init__(
+        self, order: Dict[Signature, int], parents: Dict[Signature, Collection]
+    ):
+        self._order = dict(order)
+        self._parents = {sig: tuple(parents[sig]) for sig in order}
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __contains__(self, sig):
+        return sig in self._order
+
+    def nodes(self, data: bool = False):
+        if data:
+            return [(sig, dict(order=order)) for sig, order in self._order.items()]
+        return list(self._order)
+
+    @property
+    def edges(self) -> List[Tuple[Signature, Signature]]:
+        return [(sig, p) for sig, parents in self._parents.items() for p in parents]
+
+    def to_networkx(self):
+        from networkx import DiGraph
+
+        dag = DiGraph()
+        dag.add_nodes_from(self.nodes(data=True))
+        dag.add_edges_from(self.edges)
+        return dag
+
+
 class GenericTypeLevelDispatch:
     """Dispatch on generic type signatures using the subtype relation. Functions registered with this dispatcher must
     take _types_ as arguments, not values, since the generic type of a value is either expensive to infer or not
@@ -85,7 +282,21 @@ class GenericTypeLevelDispatch:
         self.name = self.__name__ = name
         self._cache = {}
         self._sig_cache = {}
-        # self.dag = DiGraph()
+        self.hits = self.misses = 0
+        # call table for the function returned by compile(); key -> function ready to call
+        self._compiled = {}
+        # guards registration and cache population; cache lookups take no lock
+        self._lock = RLock()
+        register_cache(self, str(self))
+        # arity -> per-position indexes of registered signatures, to narrow the candidates on a cache miss
+        self._index = {}
+        # registered signature -> its order of registration
+        self._order = {}
+        # the transitively reduced refinement DAG on registered signatures; signature -> signatures it directly
+        # refines, signature -> signatures directly refining it, and arity -> signatures refining no others
+        self._parents = {}
+        self._children = {}
+        self._roots = {}
         self.funcs = {}
         if isolated_bases:
             self.isolated_bases = set(
@@ -146,33 +357,308 @@ class GenericTypeLevelDispatch:
     def insert(self, sig, f, *, debug=DEBUG):
         if debug:  # pragma: no cover (debug)
             print("Registering function {} for signature {}".format(f, sig))
-        self.funcs[sig] = f
+        with self._lock:
+            if sig in self.funcs:
+                # replacing a function; update the cached resolutions to it in place
+                cache = self._cache
+                for sig_, best in self._sig_cache.items():
+                    if best == sig:
+                        cache[sig_] = f
+                        self._drop_derived(sig_)
+            else:
+                self._add_node(sig)
+                self._invalidate(sig)
+            self.funcs[sig] = f
         return self
 
+    def _invalidate(self, sig):
+        """drop the cached resolutions which a newly registered signature could change, i.e. those it refines"""
+        positions = [_nominal_class(t) for t in sig]
+        stale = []
+        for sig_ in self._sig_cache:
+            if len(sig_) != len(sig) or not all(
+                cls is None or mro is None or cls in mro
+                for cls, mro in zip(positions, map(_query_mro, sig_))
+            ):
+                continue
+            try:
+                if refines(sig_, sig):
+                    stale.append(sig_)
+            except Exception:
+                stale.append(sig_)
+        for sig_ in stale:
+            self._drop_cached(sig_)
+
+    def _drop_cached(self, sig):
+        del self._cache[sig]
+        del self._sig_cache[sig]
+        self._drop_derived(sig)
+
+    def _drop_derived(self, sig):
+        self._compiled.pop(self._compiled_key(sig), None)
+
+    def _add_node(self, sig):
+        # maintain the transitive reduction of the refinement relation; the signatures refined by `sig` are closed
+        # upward so can be found by a walk down from the roots, and those refining it must be below any of these
+        parents, children = self._parents, self._children
+        above, lowest = self._walk(sig, _refines_or_unrelated)
+        if lowest:
+            space = self._descendants(lowest[0])
+        else:
+            space = (s for s in self._order if len(s) == len(sig))
+        # as in most_refined, only the later of two mutually refining signatures is considered refined
+        below = {s for s in chain(space, above) if _refines_or_unrelated(s, sig)}
+        above.difference_update(below)
+
+        sig_parents = {s for s in above if above.isdisjoint(children[s])}
+        sig_children = {s for s in below if below.isdisjoint(parents[s])}
+        roots = self._roots.setdefault(len(sig), set())
+        for s in sig_children:
+            # edges into the new node's parents are now implied
+            parents[s].difference_update(sig_parents)
+            parents[s].add(sig)
+            roots.discard(s)
+        for s in sig_parents:
+            children[s].difference_update(sig_children)
+            children[s].add(sig)
+        parents[sig], children[sig] = sig_parents, sig_children
+        if not sig_parents:
+            roots.add(sig)
+        self._order[sig] = len(self._order)
+
+        positions = self._index.get(len(sig))
+        if positions is None:
+            positions = self._index[len(sig)] = [({}, set()) for _ in sig]
+        for (by_class, unindexed), t in zip(positions, sig):
+            cls = _nominal_class(t)
+            if cls is None:
+                unindexed.add(sig)
+            else:
+                by_class.setdefault(cls, set()).add(sig)
+
+    def _descendants(self, sig) -> Set[Signature]:
+        """`sig` and all registered signatures below it in the DAG"""
+        children = self._children
+        seen = {sig}
+        stack = [sig]
+        while stack:
+            for s in children[stack.pop()]:
+                if s not in seen:
+                    seen.add(s)
+                    stack.append(s)
+        return seen
+
+    def _candidates(self, sig) -> Optional[Set[Signature]]:
+        """registered signatures that `sig` could refine, a superset of those it does, or None if all could"""
+        positions = self._index.get(len(sig))
+        if positions is None:
+            return set()
+        candidates = None
+        for (by_class, unindexed), t in zip(positions, sig):
+            mro = _query_mro(t)
+            if mro is None:
+                continue
+            matches = set(unindexed)
+            for cls in mro:
+                sigs = by_class.get(cls)
+                if sigs is not None:
+                    matches.update(sigs)
+            candidates = matches if candidates is None else candidates & matches
+        return candidates
+
+    def _walk(self, sig, predicate) -> Tuple[Set[Signature], List[Signature]]:
+        """Walk down the DAG from the roots through the registered signatures `s` with `predicate(sig, s)`, which
+        should be closed upward. Return the set of all these and the most specific of them, in order of registration
+        """
+        candidates = self._candidates(sig)
+        children = self._children
+        tested = {}
+
+        def matches(s):
+            result = tested.get(s)
+            if result is None:
+                result = tested[s] = (
+                    candidates is None or s in candidates
+                ) and predicate(sig, s)
+            return result
+
+        stack = [s for s in self._roots.get(len(sig), ()) if matches(s)]
+        found = set(stack)
+        lowest = []
+        while stack:
+            s = stack.pop()
+            below = [c for c in children[s] if matches(c)]
+            if not below:
+                lowest.append(s)
+            for c in below:
+                if c not in found:
+                    found.add(c)
+                    stack.append(c)
+        lowest.sort(key=self._order.__getitem__)
+        return found, lowest
+
     def resolve(self, sig, *, debug: bool = False):
         if debug:  # pragma: no cover (debug)
             print("Resolving signature {} for dispatcher {}".format(sig, self))
         f = self._cache.get(sig)
         if f is None:
-            f = self.funcs.get(sig)
-            if f is None:
-                nodes = list(self._resolve_iter(sig, debug=debug))
-                best = self._most_specific(nodes, sig)
-                f = self.funcs[best]
-            else:
-                if debug:  # pragma: no cover (debug)
-                    print("Found signature {} in {}.funcs".format(sig, self.__name__))
-                best = sig
-
-            self._sig_cache[sig] = best
-            self._cache[sig] = f
-        elif debug:  # pragma: no cover (debug)
+            with self._lock:
+                f = self._cache.get(sig)
+                if f is None:
+                    self.misses += 1
+                    return self._resolve_miss(sig, debug)
+        self.hits += 1
+        if debug:  # pragma: no cover (debug)
             print("Found signature {} in {}._cache".format(sig, self.__name__))
         return f
 
+    def _resolve_miss(self, sig, debug: bool):
+        f = self.funcs.get(sig)
+        if f is None:
+            best = self._most_specific(self._resolve(sig, debug=debug), sig)
+            f = self.funcs[best]
+        else:
+            if debug:  # pragma: no cover (debug)
+                print("Found signature {} in {}.funcs".format(sig, self.__name__))
+            best = sig
+
+        # readers take no lock; _sig_cache must be populated first
+        self._sig_cache[sig] = best
+        self._cache[sig] = f
+        return f
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, None, len(self._cache))
+
+    def cache_clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._sig_cache.clear()
+            self._compiled.clear()
+            self.hits = self.misses = 0
+
+    def cache_mappings(self):
+        return self._cache, self._sig_cache, self._compiled
+
+    def compile(self) -> Callable:
+        """Return a frozen fast path for calling this dispatcher: a function which calls the resolved function for
+        a previously seen signature with a single dict lookup, falling back to the usual resolution for new ones.
+        Its table is kept in sync with later registrations as the dispatcher's own cache is."""
+        get, miss = self._fill_compiled().get, self._compiled_miss
+
+        def dispatch(*types, **kwargs):
+            f = get(types)
+            if f is None:
+                f = miss(types)
+            return f(*types, **kwargs)
+
+        dispatch.__name__ = dispatch.__qualname__ = self.__name__
+        return dispatch
+
+    def _fill_compiled(self) -> dict:
+        table = self._compiled
+        with self._lock:
+            for sig in list(self._sig_cache):
+                key = self._compiled_key(sig)
+                if key not in table:
+                    table[key] = self._compiled_entry(key)
+        return table
+
+    def _compiled_miss(self, key):
+        with self._lock:
+            f = self._compiled.get(key)
+            if f is None:
+                f = self._compiled[key] = self._compiled_entry(key)
+        return f
+
+    def _compiled_key(self, sig):
+        return sig
+
+    def _compiled_entry(self, types):
+        return self.resolve(types)
+
+    def export_resolutions(self) -> dict:
+        """A JSON-serializable snapshot of this dispatcher's cached resolutions, for warming the cache of a fresh
+        process with load_resolutions(). Resolutions are keyed by parameterized classpath; those involving types
+        which can't be imported by path (e.g. TypeVars, NewTypes or locally defined classes) are omitted."""
+        with self._lock:
+            funcs = list(self.funcs)
+            sig_cache = list(self._sig_cache.items())
+        signatures = {sig: i for i, sig in enumerate(funcs)}
+        resolutions = {}
+        packages = set()
+        for sig, best in sig_cache:
+            try:
+                encoded = [_encode_type(t, packages) for t in sig]
+                if tuple(map(_decode_type, encoded)) != sig:
+                    continue
+                key = ", ".join(map(parameterized_classpath, sig))
+            except Exception:
+                continue
+            resolutions.setdefault(key, [encoded, signatures[best]])
+        for sig in funcs:
+            # the packages defining the registered types also determine the resolutions
+            for t in sig:
+                try:
+                    _encode_type(t, packages)
+                except Exception:
+                    pass
+        # the python version covers the standard library
+        packages.difference_update(getattr(sys, "stdlib_module_names", ()))
+        return dict(
+            dispatcher=self.__name__,
+            python="{}.{}".format(*sys.version_info[:2]),
+            versions={p: _package_version(p) for p in sorted(packages)},
+            signatures=list(map(repr, funcs)),
+            resolutions=resolutions,
+        )
+
+    def freeze(self, path: str) -> int:
+        """write export_resolutions() to `path` as compact JSON, returning the number of resolutions written"""
+        snapshot = self.export_resolutions()
+        with open(path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        return len(snapshot["resolutions"])
+
+    def load_resolutions(self, snapshot: Union[str, dict]) -> int:
+        """Populate the resolution cache from a snapshot produced by export_resolutions() or freeze() (given as
+        a dict or a path). If the snapshot is stale - the Python version, the registered signatures, or the version
+        of any package defining a type in it have changed - nothing is loaded and a warning is issued.
+        Returns the number of resolutions loaded."""
+        if not isinstance(snapshot, dict):
+            with open(snapshot) as f:
+                snapshot = json.load(f)
+
+        resolutions = []
+        for encoded, best_ix in snapshot["resolutions"].values():
+            try:
+                resolutions.append((tuple(map(_decode_type, encoded)), best_ix))
+            except Exception:
+                # e.g. a module that can no longer be imported
+                continue
+
+        with self._lock:
+            stale = _snapshot_staleness(self, snapshot)
+            if stale is not None:
+                warn(
+                    "Not loading stale resolutions for {}: {}".format(self, stale),
+                    stacklevel=2,
+                )
+                return 0
+
+            signatures = list(self.funcs)
+            cache, sig_cache = self._cache, self._sig_cache
+            n = 0
+            for sig, best_ix in resolutions:
+                if sig not in cache:
+                    best = signatures[best_ix]
+                    sig_cache[sig] = best
+                    cache[sig] = self.funcs[best]
+                    n += 1
+        return n
+
     def all_resolutions(self, *sig, debug: bool = False) -> List[Signature]:
-        sigs = list(self._resolve_iter(sig, debug=debug))
-        best = most_refined(sigs)
+        best = self._resolve(sig, debug=debug)
         if self.isolated_bases:
             best_ = self.isolated_bases.intersection(best)
             if best_:
@@ -183,24 +669,22 @@ class GenericTypeLevelDispatch:
         resolved_sigs = self.all_resolutions(*sig, debug=debug)
         return [self.funcs[sig] for sig in resolved_sigs]
 
-    def _resolve_iter(self, sig, debug=DEBUG):
+    def _resolve(self, sig, debug=DEBUG) -> List[Signature]:
+        """the most specific registered signatures refined by `sig`"""
         edge_predicate = verbose_call(refines) if debug else refines
-        return (s for s in self.funcs if edge_predicate(sig, s))
+        return self._walk(sig, edge_predicate)[1]
 
     def _most_specific(self, nodes: List[Signature], sig: Signature) -> Signature:
         if len(nodes) == 0:
             raise UnknownSignature(self, sig)
-        elif len(nodes) > 1:
-            best = most_refined(nodes, refines)
-            if self.isolated_bases:
-                best_ = self.isolated_bases.intersection(best)
-                if best_:
-                    best = list(best_)
-
-            if len(best) > 1:
-                raise AmbiguousResolutionError(self, sig, best)
-        else:
-            best = nodes
+        best = nodes
+        if len(best) > 1 and self.isolated_bases:
+            best_ = self.isolated_bases.intersection(best)
+            if best_:
+                best = list(best_)
+
+        if len(best) > 1:
+            raise AmbiguousResolutionError(self, sig, best)
 
         return best[0]
 
@@ -218,16 +702,8 @@ class GenericTypeLevelDispatch:
     ):
         try:
             from graphviz import Digraph as Dot
-            from networkx import (
-                DiGraph,
-                induced_subgraph,
-                transitive_reduction,
-                neighbors,
-            )
         except ImportError:
-            raise ImportError(
-                "the visualize method requires graphviz and networkx>=2.0"
-            )
+            raise ImportError("the visualize method requires graphviz")
 
         dag = self.dag()
 
@@ -272,20 +748,8 @@ class GenericTypeLevelDispatch:
             d.render(path, view=view, cleanup=True)
         return d
 
-    def dag(self):
-        try:
-            from networkx import DiGraph, transitive_reduction
-        except ImportError:
-            raise ImportError("the dag method requires networkx>=2.0")
-        dag = DiGraph()
-        for order, node in enumerate(self.funcs):
-            dag.add_node(node, order=order)
-        for sig1, sig2 in combinations(self.funcs, 2):
-            if refines(sig1, sig2):
-                dag.add_edge(sig1, sig2)
-            elif refines(sig2, sig1):
-                dag.add_edge(sig2, sig1)
-        return transitive_reduction(dag)
+    def dag(self) -> "SignatureDAG":
+        return SignatureDAG(self._order, self._parents)
 
     def __call__(self, *types, **kwargs):
         f = self.resolve(types)
@@ -300,25 +764,96 @@ class GenericTypeLevelSingleDispatch(GenericTypeLevelDispatch):
     the type Dict[float, bool]. This saves the implementer some introspection of the types at the call site.
     """
 
+    def __init__(self, name, isolated_bases: Optional[List[Type]] = None):
+        # type -> (resolved function, origin, resolved args to pass to it)
+        self._args_cache = {}
+        # unordered key of a type -> the keys in _args_cache of the types equal to it, e.g. for all orderings of a
+        # Union, since a resolution is cached for just one of them and invalidating it must drop them all
+        self._args_keys = {}
+        super().__init__(name, isolated_bases=isolated_bases)
+
     def __call__(self, type_, **kwargs):
-        sig = (type_,)
-        f = self.resolve(sig)
-        org = get_generic_origin(type_)
-        # make sure we pass the args for the correct type to the registered function
-        # by ascending the generic mro;
-        # i.e. Mapping[K, V] is also a Collection[K], and if the user registered for the latter case, we want to pass
-        # the type args corresponding to that case
-        resolved_type = self._sig_cache[sig][0]
-        args = resolved_type_args(type_, resolved_type)
-        # pass the args in with the constructor for ease of implementation
+        f, org, args = self._dispatch_args(type_)
         return f(org, *args, **kwargs)
 
+    def compile(self) -> Callable:
+        get, miss = self._fill_compiled().get, self._compiled_miss
+
+        def dispatch(type_, **kwargs):
+            key = _args_key(type_)
+            f = get(key)
+            if f is None:
+                f = miss(key)
+            return f(**kwargs)
+
+        dispatch.__name__ = dispatch.__qualname__ = self.__name__
+        return dispatch
+
+    compile.__doc__ = GenericTypeLevelDispatch.compile.__doc__
+
+    def _compiled_key(self, sig):
+        # keyed as _args_cache, so that each ordering of a Union gets its own args
+        return _args_key(sig[0])
+
+    def _compiled_entry(self, key):
+        f, org, args = self._dispatch_args(key if type(key) is type else key.type)
+        return partial(f, org, *args)
+
+    def _dispatch_args(self, type_):
+        # the function is cached along with its args so that a single lookup gets a consistent triple
+        key = _args_key(type_)
+        entry = self._args_cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        with self._lock:
+            entry = self._args_cache.get(key)
+            if entry is None:
+                sig = (type_,)
+                f = self.resolve(sig)
+                org = get_generic_origin(type_)
+                # make sure we pass the args for the correct type to the registered function
+                # by ascending the generic mro;
+                # i.e. Mapping[K, V] is also a Collection[K], and if the user registered for the latter case, we want
+                # to pass the type args corresponding to that case
+                resolved_type = self._sig_cache[sig][0]
+                args = resolved_type_args(type_, resolved_type)
+                # pass the args in with the constructor for ease of implementation
+                entry = self._args_cache[key] = (f, org, args)
+                self._args_keys.setdefault(_type_key(type_), set()).add(key)
+        return entry
+
+    def _drop_derived(self, sig):
+        super()._drop_derived(sig)
+        for key in self._args_keys.pop(_type_key(sig[0]), ()):
+            self._args_cache.pop(key, None)
+            self._compiled.pop(key, None)
+
+    def cache_clear(self):
+        with self._lock:
+            super().cache_clear()
+            self._args_cache.clear()
+            self._args_keys.clear()
+
+    def cache_mappings(self):
+        return (*super().cache_mappings(), self._args_cache)
+
+
+def _type_key(type_):
+    # classes hash by identity already; generic aliases hash recursively, so key them by their interned nodes
+    return type_ if type(type_) is type else intern_type(type_)
+
+
+def _args_key(type_):
+    # as _type_key, but ordered, since the args are passed on in order and Union[int, str] == Union[str, int]
+    return type_ if type(type_) is type else intern_type(type_, ordered=True)
+
 
 def resolved_type_args(type_, resolved_type):
     if is_generic_type(resolved_type) and resolved_type is not Generic:
         # only reparameterize for concrete generics
         resolved_org = get_generic_origin(resolved_type)
-        for t in chain((type_,), reparameterized_bases(type_)):
+        for t in chain((type_,), generic_mro(type_)):
             if get_generic_origin(t) is resolved_org:
                 resolved_type = t
                 break
@@ -1,18 +1,23 @@
 # coding:utf-8
-from typing import Tuple, Union
+from typing import List, Optional, Tuple, Union
 import typing
 import builtins
 from typing import Callable
-import ast
-from functools import singledispatch
+import keyword
 import os
+import sys
 import re
 from types import MethodType, FunctionType
+from collections import OrderedDict
 from functools import partial, update_wrapper
 from textwrap import indent
+from threading import RLock, local
 from inspect import stack
-from importlib import import_module
+from contextlib import contextmanager
+from importlib import import_module, invalidate_caches
+from importlib.machinery import PathFinder
 from logging import getLogger
+from .caches import CacheInfo, register_cache, weak_lru_cache
 from .utils import py_dot_name_re
 from .types.compat import typing_to_stdlib_constructor, ForwardRef, typetypes
 
@@ -39,30 +44,250 @@ def import_object(classpath):
         return Ellipsis
 
     names = classpath.split(".")
+    cache = _classpath_cache
+    i = cache.module_lengths.get(classpath)
+    obj = None
+    if i is not None:
+        cache.hits += 1
+        obj = _cached_module(names, i)
+    if obj is None:
+        cache.misses += 1
+        i, obj = _import_longest_module(names)
 
-    i, obj = 0, None
+    for name in names[i:]:
+        obj = getattr(obj, name)
+
+    # only cached once resolved, since a failed attribute lookup may mean a module that can't be imported yet
+    cache.module_lengths[classpath] = i
+    return obj
+
+
+def _cached_module(names, i):
+    if i == 0:
+        return builtins
+    modpath = ".".join(names[:i])
+    module = sys.modules.get(modpath)
+    if module is None:
+        try:
+            module = import_module(modpath)
+        except ImportError:
+            return None
+    return module
+
+
+def _import_longest_module(names):
+    """import the module with the longest prefix of `names` as its path, returning the length of that prefix
+    and the module, or 0 and the builtins module if `names[0]` is a builtin"""
+    obj = None
     for i, name in enumerate(names, 1):
         modpath = ".".join(names[:i])
-        try:
-            # try to import a module from a qualified path
-            obj = import_module(modpath)
-        except ImportError as e:
-            # no module found; if we're at the first entry, check for a builtin object
-            if i == 1:
-                try:
-                    obj = getattr(builtins, modpath)
-                except AttributeError:
-                    raise e
+        module = sys.modules.get(modpath)
+        if module is not None:
+            obj = module
+            continue
+        if obj is not None and not hasattr(obj, "__path__"):
+            # not a package, so it has no submodules
+            return i - 1, obj
+
+        # no module found; if we're at the first entry, check for a builtin object, otherwise we've run out of
+        # modules; switch to looking up attributes
+        path_state = _search_state(obj)
+        failure = _classpath_cache.non_modules.get(modpath)
+        if failure is None or failure[0] != path_state:
+            try:
+                obj = import_module(modpath)
+            except ImportError as e:
+                # don't keep the exception itself, with its traceback
+                error_type = (
+                    ModuleNotFoundError
+                    if type(e) is ModuleNotFoundError
+                    else ImportError
+                )
+                failure = _classpath_cache.non_modules[modpath] = (
+                    path_state,
+                    error_type,
+                    str(e),
+                )
             else:
-                # otherwise, we've run out of modules; switch to looking up attributes;
-                # the current index should be retried for an attribute lookup
-                i = i - 1
-            break
+                continue
+        if i == 1:
+            if hasattr(builtins, modpath):
+                return 0, builtins
+            _, error_type, message = failure
+            raise error_type(message, name=modpath)
+        return i - 1, obj
 
-    for name in names[i:]:
-        obj = getattr(obj, name)
+    return len(names), obj
 
-    return obj
+
+def _search_state(package):
+    """the locations searched to import a submodule of `package`, or a top-level module if it's None, with their
+    modification times; a failed import is retried when this changes, e.g. when a module is added to a directory
+    """
+    if package is None:
+        sourcepath = _sourcepath_finder.current_sourcepath()
+        paths = sys.path if sourcepath is None else [sourcepath, *sys.path]
+    else:
+        paths = package.__path__
+    return tuple(map(_path_state, paths))
+
+
+def _path_state(path):
+    # the empty path is the working directory
+    path = path or os.getcwd()
+    try:
+        return path, os.stat(path).st_mtime_ns
+    except (OSError, TypeError, ValueError):
+        return path, None
+
+
+class _ClasspathCache:
+    """Resolutions of classpaths by import_object: for each classpath, the number of its leading names which make up
+    the path of the module to import (0 for builtins), and the prefixes of classpaths found not to be importable
+    modules. Modules themselves are always taken from sys.modules, and a failed import is only taken as final while
+    the locations searched for the module (the source directory (see object_from) and sys.path, or the parent
+    package's __path__) and their modification times are unchanged, much as for the finders' own caches.
+    """
+
+    def __init__(self):
+        self.hits = self.misses = 0
+        # classpath -> length of its module path
+        self.module_lengths = {}
+        # dotted path -> (searched locations and modification times, ImportError type, message)
+        self.non_modules = {}
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, None, len(self.module_lengths))
+
+    def cache_clear(self):
+        self.module_lengths.clear()
+        self.non_modules.clear()
+        self.hits = self.misses = 0
+
+    def cache_mappings(self):
+        return self.module_lengths, self.non_modules
+
+
+_classpath_cache = register_cache(
+    _ClasspathCache(), "{}.import_object".format(__name__)
+)
+
+
+class _SourcePathFinder:
+    """Finder for imports relative to a source directory, as made by module_from and object_from, without changing
+    the working directory or sys.path. The source directory is set per thread, for the duration of an import, so that
+    imports from different directories may run concurrently. While one is set, top-level modules are looked for there
+    before sys.path (as they would be if it were the working directory and at the front of sys.path), including those
+    imported in turn by the modules found there; builtin and frozen modules still take precedence, as they do over
+    sys.path. Submodules are found through their packages' __path__ as usual. Each directory gets its own finder from
+    sys.path_hooks, which caches the directory's contents and revalidates them against its modification time; the
+    finders for the `maxsize` most recently added directories are kept. Loading and locking are left to
+    importlib."""
+
+    def __init__(self, maxsize: Optional[int] = 2**10):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        # absolute directory -> path entry finder for it, or None if no path hook handles it; in order of addition
+        self.finders = OrderedDict()
+        self._local = local()
+        self._lock = RLock()
+
+    def current_sourcepath(self):
+        return getattr(self._local, "sourcepath", None)
+
+    @contextmanager
+    def sourcepath(self, sourcepath: str):
+        local_ = self._local
+        previous = getattr(local_, "sourcepath", None)
+        local_.sourcepath = os.path.abspath(sourcepath)
+        try:
+            yield
+        finally:
+            local_.sourcepath = previous
+
+    def find_spec(self, fullname, path=None, target=None):
+        sourcepath = getattr(self._local, "sourcepath", None)
+        if sourcepath is None or path is not None:
+            return None
+        finder = self._finder(sourcepath)
+        return None if finder is None else finder.find_spec(fullname, target)
+
+    def _finder(self, sourcepath: str):
+        finders = self.finders
+        try:
+            finder = finders[sourcepath]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return finder
+        with self._lock:
+            if sourcepath in finders:
+                return finders[sourcepath]
+            self.misses += 1
+            finder = None
+            for hook in sys.path_hooks:
+                try:
+                    finder = hook(sourcepath)
+                except ImportError:
+                    continue
+                break
+            finders[sourcepath] = finder
+            self._evict()
+        return finder
+
+    def _evict(self):
+        maxsize = self.maxsize
+        if maxsize is not None:
+            while len(self.finders) > maxsize:
+                self.finders.popitem(last=False)
+
+    def invalidate_caches(self):
+        self.cache_clear()
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.finders))
+
+    def cache_clear(self):
+        with self._lock:
+            self.finders.clear()
+            self.hits = self.misses = 0
+
+    def resize(self, maxsize: Optional[int]):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def cache_mappings(self):
+        return (self.finders,)
+
+
+_sourcepath_finder = register_cache(
+    _SourcePathFinder(), "{}.module_from".format(__name__)
+)
+# just ahead of the sys.path finder, as the source directory is searched before sys.path, but after the builtin and
+# frozen importers, so that it can't shadow their modules; replacing any from a previous load of this module
+sys.meta_path[:] = [
+    finder
+    for finder in sys.meta_path
+    if (type(finder).__module__, type(finder).__qualname__)
+    != (__name__, _SourcePathFinder.__qualname__)
+]
+_i = (
+    sys.meta_path.index(PathFinder)
+    if PathFinder in sys.meta_path
+    else len(sys.meta_path)
+)
+sys.meta_path.insert(_i, _sourcepath_finder)
+del _i
+
+
+def invalidate_import_caches():
+    """Clear the classpath resolutions cached by import_object and the directory finders cached by module_from and
+    object_from, along with the caches of all finders on sys.meta_path, via importlib.invalidate_caches()
+    """
+    invalidate_caches()
+    _classpath_cache.cache_clear()
 
 
 def import_type(parameterized_classpath) -> type:
@@ -70,11 +295,10 @@ def import_type(parameterized_classpath) -> type:
         parameterized_classpath = parameterized_classpath.__forward_arg__
 
     if py_dot_name_regex.fullmatch(parameterized_classpath):
-        # prevent an ast.parse call if it's a simple case
+        # no need to parse if it's a simple case
         t = _eval_type_tree_expr(parameterized_classpath)
     else:
-        tree = ast.parse(parameterized_classpath, mode="eval").body
-        expr = _to_typetree_expr(tree)
+        expr = _parse_type_tree_expr(parameterized_classpath)
         t = _eval_type_tree_expr(expr)
 
     if not isinstance(t, (type, typetypes)):
@@ -102,73 +326,98 @@ def _eval_type_tree_expr(expr: Union[str, Tuple[str, ...]]) -> type:
     return eval_type_tree(types)
 
 
-@singledispatch
-def _to_typetree_expr(node) -> Union[str, Tuple[str, ...]]:
-    raise SyntaxError("{} is not a valid python generic type reference".format(node))
-
-
-@singledispatch
-def _to_classpath(node) -> str:
-    raise SyntaxError("{} is not a valid python classpath".format(node))
-
-
-@singledispatch
-def _to_index_expr(node):
-    raise SyntaxError(
-        "{} is not a valid index value for the parameters of a parameterized type expression".format(
-            node
-        )
+# tokens of parameterized type expressions: dotted names (possibly with whitespace around the dots), brackets,
+# parentheses, commas and ellipses
+_type_expr_token_regex = re.compile(
+    r"\s*(?:(\.\.\.)|({name}(?:\s*\.\s*{name})*)|([\[\](),]))\s*".format(
+        name=r"[^\W\d]\w*"
     )
+)
 
 
-@_to_typetree_expr.register(ast.Subscript)
-def _to_typetree_expr_subscript(
-    node: ast.Subscript,
-) -> Tuple[Union[str, Tuple[str, ...]], ...]:
-    cp = _to_classpath(node.value)
-    index_cps = _to_index_expr(node.slice)
-    return (cp, *index_cps)
-
-
-@_to_classpath.register(ast.Attribute)
-@_to_typetree_expr.register(ast.Attribute)
-def _to_classpath_attr(node: ast.Attribute) -> str:
-    return ".".join((_to_classpath(node.value), node.attr))
-
-
-@_to_classpath.register(ast.Name)
-@_to_typetree_expr.register(ast.Name)
-def _to_classpath_name(node: ast.Name) -> str:
-    return node.id
-
-
-@_to_index_expr.register(ast.Attribute)
-@_to_index_expr.register(ast.Name)
-def _to_index_expr_ref(node: Union[ast.Attribute, ast.Name]) -> Tuple[str, ...]:
-    return (_to_classpath(node),)
+@weak_lru_cache(maxsize=2**12)
+def _parse_type_tree_expr(expr: str) -> Union[str, Tuple[str, ...]]:
+    """Parse a parameterized type expression such as 'typing.Dict[str, mypkg.models.User]' into a tree of tuples of
+    classpaths, ('typing.Dict', 'str', 'mypkg.models.User'). Only dotted names, subscripts and ellipses are allowed.
+    """
+    tokens = _tokenize_type_tree_expr(expr)
+    tree, i = _parse_type_tree_tokens(tokens, 0, expr)
+    if i != len(tokens):
+        raise _type_expr_syntax_error(expr)
+    return tree
+
+
+def _tokenize_type_tree_expr(expr: str) -> List[str]:
+    tokens = []
+    pos, end = 0, len(expr)
+    match = _type_expr_token_regex.match
+    while pos < end:
+        m = match(expr, pos)
+        if m is None:
+            raise _type_expr_syntax_error(expr)
+        ellipsis, name, punct = m.groups()
+        if name is not None:
+            name = "".join(name.split())
+            if any(map(keyword.iskeyword, name.split("."))):
+                raise _type_expr_syntax_error(expr)
+            tokens.append(name)
+        else:
+            tokens.append(ellipsis or punct)
+        pos = m.end()
+    return tokens
+
+
+def _parse_type_tree_tokens(tokens: List[str], i: int, expr: str):
+    # type_expr := name | name '[' (index_list | '(' index_list? ')') ']'
+    # index_list := index_expr (',' index_expr)* ','?; index_expr := type_expr | '...'
+    if i >= len(tokens) or tokens[i] in _type_expr_punctuation:
+        raise _type_expr_syntax_error(expr)
+    name = tokens[i]
+    i += 1
+    if i == len(tokens) or tokens[i] != "[":
+        return name, i
+
+    i += 1
+    if i < len(tokens) and tokens[i] == "(":
+        # a parenthesized index is equivalent to the bare one; `Tuple[()]` has no args
+        args, i = _parse_type_tree_args(tokens, i + 1, ")", expr, allow_empty=True)
+        if i == len(tokens) or tokens[i] != "]":
+            raise _type_expr_syntax_error(expr)
+        i += 1
+    else:
+        args, i = _parse_type_tree_args(tokens, i, "]", expr)
+    return (name, *args), i
 
 
-@_to_index_expr.register(ast.Constant)
-def _to_index_expr_constant(node: ast.Constant) -> Tuple[str, ...]:
-    if node.value is Ellipsis:
-        return ("...",)
-    raise SyntaxError(
-        "{} is not a valid subexpression of a parameterized type expression".format(
-            node.value
-        )
-    )
+def _parse_type_tree_args(
+    tokens: List[str], i: int, close: str, expr: str, allow_empty: bool = False
+):
+    args = []
+    if allow_empty and i < len(tokens) and tokens[i] == close:
+        return args, i + 1
+    while True:
+        if i < len(tokens) and tokens[i] == "...":
+            args.append("...")
+            i += 1
+        else:
+            arg, i = _parse_type_tree_tokens(tokens, i, expr)
+            args.append(arg)
+        token = tokens[i] if i < len(tokens) else None
+        if token == ",":
+            i += 1
+            if i < len(tokens) and tokens[i] == close:
+                return args, i + 1
+        elif token == close:
+            return args, i + 1
+        else:
+            raise _type_expr_syntax_error(expr)
 
 
-@_to_index_expr.register(ast.Tuple)
-def _to_index_expr_tuple(node: ast.Tuple) -> Tuple[Union[str, Tuple[str, ...]], ...]:
-    return tuple(map(_to_index_expr, node.elts))
+_type_expr_punctuation = frozenset(("[", "]", "(", ")", ",", "..."))
 
 
-@_to_index_expr.register(ast.Subscript)
-def _to_index_expr_subscript(
-    node: ast.Subscript
-) -> Tuple[Union[str, Tuple[str, ...]], ...]:
-    return (_to_typetree_expr(node),)
+def _type_expr_syntax_error(expr: str) -> SyntaxError:
+    return SyntaxError("{!r} is not a valid python generic type reference".format(expr))
 
 
 def lazy_imports(*modulespecs):
@@ -183,6 +432,60 @@ def lazy_imports(*modulespecs):
     return partial(LazyImportsCallable, modulespecs)
 
 
+_lazy_module_forwarded_attrs = ("__doc__", "__package__", "__loader__", "__spec__")
+
+
+class LazyModule(ModuleType):
+    """stand-in for the module `name`, which is imported on first access to any of its attributes. Once imported,
+    attribute access is delegated to the real module, which is also the one in sys.modules
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        # ModuleType sets these on the proxy itself; remove them so that they're taken from the module
+        for attr in _lazy_module_forwarded_attrs:
+            self.__dict__.pop(attr, None)
+        self.__lazy_lock__ = RLock()
+        self.__lazy_module__ = None
+
+    @property
+    def __doc__(self):
+        # a property, as LazyModule.__doc__ would otherwise be found before __getattr__ is tried
+        return self.__load__().__doc__
+
+    def __load__(self) -> ModuleType:
+        module = self.__lazy_module__
+        if module is None:
+            with self.__lazy_lock__:
+                module = self.__lazy_module__
+                if module is None:
+                    module = self.__lazy_module__ = import_module(self.__name__)
+        return module
+
+    def __getattr__(self, attr):
+        # only called for attributes not set on the proxy itself
+        return getattr(self.__load__(), attr)
+
+    def __dir__(self):
+        return dir(self.__load__())
+
+    def __repr__(self):
+        module = self.__lazy_module__
+        if module is None:
+            return "<lazy module {!r}>".format(self.__name__)
+        return repr(module)
+
+
+def lazy_module(name: str) -> ModuleType:
+    """a proxy for the module `name` which imports it on first attribute access, for deferring the import of heavy or
+    optional dependencies; e.g. `np = lazy_module("numpy")` at module level. If the module is already imported, it is
+    returned as is"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
 class _ImportSpec:
     names = modname = asname = None
 
@@ -243,24 +546,41 @@ class LazyImportsCallable:
 
         self.__imports__ = list(map(_validate_module_spec, modulespecs))
         self.__called__ = False
+        self.__lock__ = RLock()
         self.__func__ = func
         # this sets __wrapped__
         update_wrapper(self, func)
 
     def __call__(self, *args, **kwargs):
-        f = self.__func__
         if not self.__called__:
-            globals_ = get_globals(f)
-            for spec in self.__imports__:
-                _import(*spec, globals_=globals_)
+            with self.__lock__:
+                if not self.__called__:
+                    globals_ = get_globals(self.__func__)
+                    for spec in self.__imports__:
+                        _import(*spec, globals_=globals_)
+                    self.__called__ = True
+                    self._unwrap(globals_)
         return self.__wrapped__(*args, **kwargs)
 
+    def _unwrap(self, globals_):
+        # once the imports are done the wrapper has no more work to do; rebind the module-level name to the wrapped
+        # function so that subsequent calls through it bypass the wrapper entirely
+        name = self.__name__
+        if self.__qualname__ == name and globals_.get(name) is self:
+            globals_[name] = self.__wrapped__
+
     def __get__(self, instance, owner):
+        if self.__called__:
+            # methods likewise bind the wrapped function directly, and the class attribute is replaced with it
+            if owner is not None and vars(owner).get(self.__name__) is self:
+                try:
+                    setattr(owner, self.__name__, self.__wrapped__)
+                except (AttributeError, TypeError):  # pragma: no cover
+                    pass
+            return self.__wrapped__.__get__(instance, owner)
         if instance is None:
             return self
-        f = MethodType(self.__call__, instance)
-        setattr(instance, self.__name__, f)
-        return f
+        return MethodType(self, instance)
 
 
 def get_globals(callable_):
@@ -297,7 +617,7 @@ def get_globals(callable_):
 def module_from(module, sourcepath=None):
     """
     Same semantics as importlib.import_module, but imports can be made relative to a given source directory without
-    affecting sys.path
+    affecting sys.path or the working directory, so they may be made concurrently from multiple threads
     :param module: a '.'-separated name referencing a module in the current environment.
     :param sourcepath: a path to a directory from which to perform the import. Optionally, this may set to None and
       the directory path prepended on the module name with a separating slash
@@ -311,10 +631,8 @@ def module_from(module, sourcepath=None):
     )
 
     if sourcepath is not None:
-        wd = os.getcwd()
-        os.chdir(sourcepath)
-        mod = import_module(module)
-        os.chdir(wd)
+        with _sourcepath_finder.sourcepath(sourcepath):
+            mod = import_module(module)
     else:
         mod = import_module(module)
 
@@ -324,7 +642,7 @@ def module_from(module, sourcepath=None):
 def object_from(classpath, sourcepath=None, subclass_check=None, instance_check=None):
     """
     Same semantics as import_object, but imports can be made relative to a given source directory without
-    affecting sys.path
+    affecting sys.path or the working directory, so they may be made concurrently from multiple threads
     """
     classpath, sourcepath = _classpath_and_dir(classpath, sourcepath, checkdir=True)
     logger.debug(
@@ -335,10 +653,8 @@ def object_from(classpath, sourcepath=None, subclass_check=None, instance_check=
     )
 
     if sourcepath is not None:
-        wd = os.getcwd()
-        os.chdir(sourcepath)
-        obj = import_object(classpath)
-        os.chdir(wd)
+        with _sourcepath_finder.sourcepath(sourcepath):
+            obj = import_object(classpath)
     else:
         obj = import_object(classpath)
 
@@ -0,0 +1,244 @@
+# coding:utf-8
+from typing import Callable, Dict, Optional, Set, Tuple
+import abc
+import atexit
+import os
+import sqlite3
+import sys
+from threading import RLock
+from .classes import parameterized_classpath
+from .types import get_generic_origin, get_generic_args
+from .types import issubclass_generic_
+
+# modules whose contents are fixed for a given python version
+_STABLE_MODULES = frozenset(("builtins", "typing", "collections.abc", "numbers"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS subtypes (
+    t1 TEXT, t2 TEXT, fingerprint TEXT, result INTEGER, PRIMARY KEY (t1, t2)
+);
+"""
+
+
+class PersistentSubtypeCache:
+    """A second-level cache for issubclass_generic, persisted in a sqlite database at `path` so that processes running
+    the same code can share results. Entries are keyed by the parameterized classpaths of the types and hold a
+    fingerprint of the modules defining the classes involved and all of their bases (file modification time and
+    size), and of the classes registered (via ABC.register) on any ABCs among those; an entry is ignored when any of
+    these has changed. The whole database is reset when the python or library version changes. Types involving
+    classes that can't be found at their classpath (e.g. locally defined classes) are never persisted.
+    Not tracked: registrations on ABCs outside the classes' MROs which issubclass also consults (e.g. a class
+    registered as a MutableSequence is a Sequence), and __subclasshook__s that depend on anything other than the
+    classes' own definitions. Clear the cache if these change without any of the tracked modules changing.
+    Entries are read once, on first use, and new results are written in batches of `batch_size`, by flush(), and at
+    exit, so that many short-lived processes may share a database read-mostly. Install one with
+    enable_persistent_subtype_cache()."""
+
+    def __init__(self, path: str, batch_size: int = 256, timeout: float = 30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.hits = self.misses = 0
+        self._entries = None
+        self._pending = []
+        self._conn = None
+        self._pid = None
+        # module name -> fingerprint
+        self._module_fingerprints = {}
+        self._lock = RLock()
+        atexit.register(self.flush)
+
+    def _connection(self) -> sqlite3.Connection:
+        # connections can't be shared with forked children
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+            self._entries = None
+            self._pending = []
+        return self._conn
+
+    def _load(self) -> Dict[Tuple[str, str], Tuple[str, bool]]:
+        conn = self._connection()
+        entries = self._entries
+        if entries is None:
+            version = _version()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT value FROM meta WHERE key = 'version'")
+                row = row.fetchone()
+                if row is None or row[0] != version:
+                    conn.execute("DELETE FROM subtypes")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,)
+                    )
+                rows = conn.execute("SELECT t1, t2, fingerprint, result FROM subtypes")
+                entries = {(t1, t2): (fp, bool(r)) for t1, t2, fp, r in rows}
+            self._entries = entries
+        return entries
+
+    def get(self, t1, t2, compute: Callable[[type, type], bool]) -> bool:
+        """the persisted result of issubclass_generic(t1, t2), or `compute(t1, t2)`, which is then persisted"""
+        key = self._key(t1, t2)
+        if key is None:
+            return compute(t1, t2)
+        paths, fingerprint = key
+        with self._lock:
+            entry = self._load().get(paths)
+        if entry is not None and entry[0] == fingerprint:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        result = compute(t1, t2)
+        with self._lock:
+            self._entries[paths] = (fingerprint, result)
+            self._pending.append((*paths, fingerprint, int(result)))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return result
+
+    def flush(self):
+        """write any new results to the database"""
+        with self._lock:
+            pending = self._pending
+            if not pending or self._pid != os.getpid():
+                return
+            self._pending = []
+            with self._conn as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO subtypes VALUES (?, ?, ?, ?)", pending
+                )
+
+    def clear(self):
+        """remove all persisted results"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM subtypes")
+            self._entries = {}
+            self._pending = []
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = self._pid = self._entries = None
+        atexit.unregister(self.flush)
+
+    def _key(self, t1, t2) -> Optional[Tuple[Tuple[str, str], str]]:
+        classes = set()
+        try:
+            if not (_collect_classes(t1, classes) and _collect_classes(t2, classes)):
+                return None
+            paths = parameterized_classpath(t1), parameterized_classpath(t2)
+        except Exception:
+            return None
+        modules, abcs = set(), set()
+        for cls in classes:
+            for base in cls.__mro__:
+                modules.add(base.__module__)
+                if isinstance(base, abc.ABCMeta):
+                    abcs.add(base)
+        fingerprint = ";".join(
+            [
+                *map(self._module_fingerprint, sorted(modules - _STABLE_MODULES)),
+                *sorted(map(_registry_fingerprint, abcs)),
+            ]
+        )
+        return paths, fingerprint
+
+    def _module_fingerprint(self, name: str) -> str:
+        fingerprint = self._module_fingerprints.get(name)
+        if fingerprint is None:
+            path = getattr(sys.modules.get(name), "__file__", None)
+            try:
+                stat = os.stat(path)
+            except (OSError, TypeError):
+                # no source file; only the interpreter version (part of the database version) can change it
+                fingerprint = name
+            else:
+                fingerprint = "{}:{}:{}".format(name, stat.st_mtime_ns, stat.st_size)
+            self._module_fingerprints[name] = fingerprint
+        return fingerprint
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.path)
+
+
+def _collect_classes(t, classes: Set[type]) -> bool:
+    """Add all the classes in `t` to `classes`, returning False if any of them can't be found at its classpath, in
+    which case its parameterized classpath can't identify it across processes"""
+    if t is Ellipsis:
+        return True
+    if isinstance(t, list):
+        return all(_collect_classes(t_, classes) for t_ in t)
+    args = get_generic_args(t, evaluate=True)
+    if args:
+        return _collect_classes(get_generic_origin(t), classes) and all(
+            _collect_classes(a, classes) for a in args
+        )
+    module = getattr(t, "__module__", None)
+    if module not in _STABLE_MODULES:
+        if module == "__main__":
+            # differs from process to process
+            return False
+        obj = sys.modules.get(module)
+        for name in getattr(t, "__qualname__", "<unknown>").split("."):
+            obj = getattr(obj, name, None)
+        if obj is not t:
+            return False
+    if isinstance(t, type):
+        classes.add(t)
+    return True
+
+
+def _registry_fingerprint(cls: abc.ABCMeta) -> str:
+    """the classes registered as virtual subclasses of an ABC"""
+    registry = abc._get_dump(cls)[0]
+    registered = (r() for r in registry)
+    return "{}.{}<{}>".format(
+        cls.__module__,
+        cls.__qualname__,
+        ",".join(
+            sorted(
+                "{}.{}".format(c.__module__, c.__qualname__)
+                for c in registered
+                if c is not None
+            )
+        ),
+    )
+
+
+def _version() -> str:
+    from . import __version__
+
+    return "python {}; bourbaki.introspection {}".format(
+        ".".join(map(str, sys.version_info[:3])), __version__
+    )
+
+
+def enable_persistent_subtype_cache(
+    path: str, batch_size: int = 256
+) -> PersistentSubtypeCache:
+    """Persist results of issubclass_generic at `path` (a sqlite database, created if necessary) in addition to
+    caching them in memory, and consult it before computing them"""
+    cache = PersistentSubtypeCache(path, batch_size=batch_size)
+    disable_persistent_subtype_cache()
+    issubclass_generic_.set_persistent_cache(cache)
+    return cache
+
+
+def disable_persistent_subtype_cache():
+    """flush and uninstall the persistent cache for issubclass_generic, if any"""
+    cache = issubclass_generic_.set_persistent_cache(None)
+    if cache is not None:
+        cache.close()
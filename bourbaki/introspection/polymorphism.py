@@ -1,10 +1,12 @@
 # coding:utf-8
-from typing import Mapping, Callable, Hashable, Any, Optional
+from typing import Mapping, Callable, Hashable, Any, Optional, List, Tuple
 from inspect import Parameter
 import collections.abc
-from functools import lru_cache
+from collections import namedtuple
 from multipledispatch import Dispatcher
 from types import MethodType
+from weakref import WeakKeyDictionary, WeakSet
+from .caches import CacheInfo, register_cache
 
 Empty = Parameter.empty
 
@@ -40,8 +42,24 @@ class TypeLevelDispatch(Dispatcher):
         return f(*types)
 
 
+# name of the attribute in which classes hold the dispatch tables bound to them
+_DISPATCH_TABLES = "__multiple_dispatch_tables__"
+
+
 class MultipleDispatchMethod(Dispatcher):
-    __slots__ = Dispatcher.__slots__
+    __slots__ = ("_version", "_tables", "_bound", "hits", "misses", "__weakref__")
+
+    def __init__(self, name, doc=None):
+        super().__init__(name, doc)
+        # incremented when methods are added or the cache is cleared, so that tables already bound to classes are
+        # rebuilt lazily
+        self._version = 0
+        # tables for classes that don't accept new attributes, e.g. builtins
+        self._tables = WeakKeyDictionary()
+        # all classes holding a table for this method, wherever it's stored
+        self._bound = WeakSet()
+        self.hits = self.misses = 0
+        register_cache(self, str(self))
 
     def __get__(self, obj, cls):
         f = self.bind_class(cls)
@@ -52,22 +70,83 @@ class MultipleDispatchMethod(Dispatcher):
     def add(self, signature, func):
         name = func if isinstance(func, str) else func.__name__
         super().add(signature, name)
+        self._version += 1
 
-    @lru_cache(None)
     def bind_class(self, cls):
+        """A Dispatcher over `cls`'s implementations of the registered method names. The table is stored on `cls`
+        itself, so that dynamically created subclasses are garbage collected along with their tables.
+        """
+        tables = cls.__dict__.get(_DISPATCH_TABLES)
+        entry = self._tables.get(cls) if tables is None else tables.get(self)
+        version = self._version
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
         new = Dispatcher(self.name, self.doc)
-        for ts, name in self.funcs.items():
+        for ts, name in list(self.funcs.items()):
             new.add((object, *ts), getattr(cls, name))
+        entry = (version, new)
+        if tables is not None:
+            tables[self] = entry
+        else:
+            try:
+                setattr(cls, _DISPATCH_TABLES, {self: entry})
+            except (TypeError, AttributeError):
+                self._tables[cls] = entry
+        self._bound.add(cls)
         return new
 
+    def _entry(self, cls):
+        tables = cls.__dict__.get(_DISPATCH_TABLES)
+        return self._tables.get(cls) if tables is None else tables.get(self)
+
+    def _current_tables(self):
+        version = self._version
+        tables = {}
+        for cls in list(self._bound):
+            entry = self._entry(cls)
+            if entry is not None and entry[0] == version:
+                tables[cls] = entry[1]
+        return tables
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, None, len(self._current_tables()))
+
+    def cache_clear(self):
+        # tables stored on classes are dropped lazily, by being rebuilt on their next lookup
+        self._version += 1
+        self._tables.clear()
+        self._bound.clear()
+        self.hits = self.misses = 0
+
+    def cache_mappings(self):
+        return (self._current_tables(),)
+
 
 Predicate = Callable[[Any], bool]
 
 
+PredicateStats = namedtuple("PredicateStats", ["predicate", "target", "fired"])
+
+
 class SingleValueDispatch:
-    def __init__(self, name):
+    """Dispatch on values by predicates, the most recently registered matching predicate taking precedence.
+    If `key` is given, predicates must depend on values only through `key(value)` (e.g. `key=type` when dispatching
+    on types), and the resolved function is memoized per key, making dispatch a single hash lookup in the usual case.
+    """
+
+    def __init__(self, name, key: Optional[Callable[[Any], Hashable]] = None):
         self.name = self.__name__ = name
+        self.key = key
         self.funcs = []
+        # number of times each entry in self.funcs has fired
+        self._fired = []
+        # key(value) -> (index in self.funcs, resolved function)
+        self._memo = {}
+        self.hits = self.misses = 0
+        register_cache(self, str(self))
 
     def register(self, predicate: Predicate):
         def dec(f: Callable):
@@ -101,21 +180,71 @@ class SingleValueDispatch:
         if not callable(predicate):  # pragma: no cover
             raise TypeError("Predicates must be callable; got {}".format(predicate))
 
-        self.funcs.append((predicate, value_mapping, f))
+        last = self.funcs[-1] if self.funcs else (None, None, None)
+        if value_mapping is not None and last[1] is not None and last[0] is predicate:
+            # consecutive forks on the same predicate; merge them into one lookup, the later taking precedence
+            self.funcs[-1] = (predicate, {**last[1], **value_mapping}, None)
+        else:
+            self.funcs.append((predicate, value_mapping, f))
+            self._fired.append(0)
+        # replaced rather than cleared, so that resolutions in progress can't write stale entries to the new memo
+        self._memo = {}
 
     def __call__(self, arg, *args, **kwargs):
-        for predicate, mapping, f in reversed(self.funcs):
+        keyfunc = self.key
+        if keyfunc is None:
+            i, f = self._resolve(arg)
+        else:
+            key = keyfunc(arg)
+            memo = self._memo
+            try:
+                i, f = memo[key]
+            except KeyError:
+                self.misses += 1
+                i, f = memo[key] = self._resolve(arg)
+            except TypeError:
+                # unhashable key
+                i, f = self._resolve(arg)
+            else:
+                self.hits += 1
+        self._fired[i] += 1
+        return f(arg, *args, **kwargs)
+
+    def _resolve(self, arg) -> Tuple[int, Callable]:
+        funcs = self.funcs
+        for i in range(len(funcs) - 1, -1, -1):
+            predicate, mapping, f = funcs[i]
             key = predicate(arg)
             if mapping is None:
                 if key:
-                    return f(arg, *args, **kwargs)
+                    return i, f
                 continue
             else:
                 f = mapping.get(key)
                 if f is None:
                     continue
-                return f(arg, *args, **kwargs)
+                return i, f
         raise ValueError("No predicates in {} matched value {}".format(self, arg))
 
+    def stats(self) -> List[PredicateStats]:
+        """The registered predicates with their functions (or mappings, for forks) and the number of times each has
+        fired, in order of precedence"""
+        return [
+            PredicateStats(predicate, f if mapping is None else mapping, fired)
+            for (predicate, mapping, f), fired in zip(
+                reversed(self.funcs), reversed(self._fired)
+            )
+        ]
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, None, len(self._memo))
+
+    def cache_clear(self):
+        self._memo = {}
+        self.hits = self.misses = 0
+
+    def cache_mappings(self):
+        return (self._memo,)
+
     def __str__(self):
         return "{}({})".format(type(self).__name__, repr(self.__name__))
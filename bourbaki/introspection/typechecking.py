@@ -2,15 +2,24 @@
 import typing
 from inspect import signature, Parameter
 import operator
-from functools import partial, lru_cache
+import random
+import sys
+from array import array
+import collections.abc
+from abc import ABCMeta
+from functools import partial
+from itertools import islice, compress, count
+from threading import local
 from warnings import warn
 from .builtin_signatures import builtin_callable_types
+from .caches import weak_lru_cache
 from .utils import name_of
 from .imports import import_type
 from .types import (
     LazyType,
     is_top_type,
     to_concrete_type,
+    to_type_alias,
     constraint_type,
     issubclass_generic,
     reconstruct_generic,
@@ -29,6 +38,7 @@ from .generic_dispatch_helpers import (
     MappingWrapper,
     LazyWrapper,
     PicklableWithType,
+    AllFailed,
 )
 
 
@@ -37,27 +47,296 @@ type_checker = GenericTypeLevelSingleDispatch(
 )
 
 
-@lru_cache(None)
+# the checkers reference their types, so the bound is what limits the dynamically created classes retained here
+@weak_lru_cache(maxsize=2**12)
 def type_checker_for(type_):
     return type_checker(type_)
 
 
-def isinstance_generic(obj, type_):
-    return type_checker_for(type_)(obj)
+def budgeted_type_checker_for(
+    type_,
+    max_elements: typing.Union[int, typing.Mapping[typing.Type, int]],
+    sample: typing.Union[bool, random.Random] = False,
+):
+    """A type checker for `type_` which checks at most `max_elements` elements of any collection, mapping or
+    variable-length tuple in a value, bounding the cost of a check regardless of the size of the value.
+
+    :param max_elements: the budget per container; either an int, or a mapping from container types to budgets, in
+      which case each container check takes the budget of the first type in the mapping that its type is a subtype of,
+      and is unbounded if there is none. Budgets apply to each container in a value independently, so e.g. a budget of
+      k for List[List[int]] checks up to k * k ints.
+    :param sample: if False, check the first `max_elements` elements of each container. If True, check a uniform
+      random sample of `max_elements` elements, using the `random` module, or pass a `random.Random` instance to
+      control the random state. If a fraction p of the n elements of a container fail the check, a random sample of k
+      elements misses all of them with probability at most (1 - p) ** k; e.g. k = 100 detects a 5% rate of bad
+      elements with probability > 99.4%. There is no such guarantee when checking the first k elements.
+      In either case, a False result is always correct; only True results may be false negatives.
+    Note that lazy type references are checked in full.
+    """
+    if isinstance(max_elements, collections.abc.Mapping):
+        max_elements = tuple((to_type_alias(t), n) for t, n in max_elements.items())
+        budgets = [n for _, n in max_elements]
+    else:
+        budgets = [max_elements]
+    for n in budgets:
+        if n < 0:
+            raise ValueError(
+                "max_elements must be a non-negative int; got {}".format(n)
+            )
+    checker = _budgeted_type_checker_for(type_, max_elements, bool(sample))
+    if isinstance(sample, random.Random):
+        # the checker tree is shared by all random states; the one to use is passed at call time
+        return partial(_check_with_rng, checker, sample)
+    return checker
+
+
+@weak_lru_cache(maxsize=2**12)
+def _budgeted_type_checker_for(type_, max_elements, sample: bool):
+    return _budgeted(type_checker_for(type_), max_elements, sample)
+
+
+# the random state for sampled checks in progress in the current thread, if not the random module's
+_sampling = local()
+
+
+def _check_with_rng(checker, rng: random.Random, value) -> bool:
+    previous = getattr(_sampling, "rng", None)
+    _sampling.rng = rng
+    try:
+        return checker(value)
+    finally:
+        _sampling.rng = previous
+
+
+def _resolve_checker(type_, compiled=False, max_elements=None, sample=False):
+    if max_elements is not None:
+        return budgeted_type_checker_for(type_, max_elements, sample)
+    if compiled:
+        return compiled_type_checker_for(type_)
+    return type_checker_for(type_)
+
+
+def isinstance_generic(
+    obj,
+    type_,
+    compiled: bool = False,
+    max_elements: typing.Union[int, typing.Mapping[typing.Type, int], None] = None,
+    sample: typing.Union[bool, random.Random] = False,
+):
+    """Check that `obj` is an instance of the (possibly parameterized generic) `type_`.
+    If `compiled` is True, use a checker compiled to a single specialized function (see `compile_type_checker`).
+    If `max_elements` is passed, check at most that many elements of any container in `obj`, optionally a random
+    sample of them; see `budgeted_type_checker_for` for details. `compiled` is ignored in that case.
+    """
+    return _resolve_checker(type_, compiled, max_elements, sample)(obj)
+
+
+def isinstance_generic_many(
+    values: typing.Iterable, type_, failures: bool = False, **kwargs
+) -> typing.List[typing.Union[bool, int]]:
+    """Check each of `values` against `type_`, resolving the type checker only once.
+    Returns a list of booleans, one per value, or if `failures` is True, the indices of the values that failed.
+    Keyword args are as for `isinstance_generic`."""
+    check = _resolve_checker(type_, **kwargs)
+    if failures:
+        return list(_failed_indices(check, values))
+    return list(map(check, values))
+
+
+def isinstance_generic_iter(
+    values: typing.Iterable,
+    type_,
+    failures: bool = False,
+    chunksize: typing.Optional[int] = None,
+    **kwargs,
+) -> typing.Iterator:
+    """Streaming version of `isinstance_generic_many`, consuming `values` lazily.
+    If `chunksize` is None, yields a boolean per value, or if `failures` is True, the index of each value that fails.
+    Otherwise, `values` are consumed `chunksize` at a time and a list of booleans (or of indices of failures, counted
+    from the start of `values`) is yielded per chunk.
+    Keyword args are as for `isinstance_generic`. The type checker is resolved, and so any error in doing so raised,
+    at the call, not on iteration."""
+    if chunksize is not None and chunksize < 1:
+        raise ValueError("chunksize must be a positive int; got {}".format(chunksize))
+    check = _resolve_checker(type_, **kwargs)
+    if chunksize is None:
+        if failures:
+            return _failed_indices(check, values)
+        return map(check, values)
+    return _check_chunks(check, values, failures, chunksize)
+
+
+def _check_chunks(check, values, failures, chunksize):
+    values = iter(values)
+    offset = 0
+    while True:
+        chunk = list(islice(values, chunksize))
+        if not chunk:
+            return
+        if failures:
+            yield list(_failed_indices(check, chunk, offset))
+        else:
+            yield list(map(check, chunk))
+        offset += len(chunk)
+
+
+def _failed_indices(check, values, start=0):
+    return compress(count(start), map(operator.not_, map(check, values)))
 
 
 def _isinstance(type_, obj):
     return isinstance(obj, type_)
 
 
+def _isinstance_target(checker):
+    """the type argument of a leaf isinstance check as constructed by `isinstance_of`, or None if `checker` is not of
+    that form"""
+    if (
+        isinstance(checker, partial)
+        and checker.func is _isinstance
+        and len(checker.args) == 1
+        and not checker.keywords
+    ):
+        return checker.args[0]
+    return None
+
+
+# metaclass instance checks which depend only on the runtime type of the instance;
+# for these, issubclass(type(obj), t) implies isinstance(obj, t)
+_type_based_instancechecks = (type.__instancecheck__, ABCMeta.__instancecheck__)
+
+
+def _homogeneous_check_target(checker):
+    """If `checker` amounts to an isinstance check against plain classes, return the class (or tuple of classes)
+    so that collections can be checked one distinct runtime type at a time; otherwise return None
+    """
+    if isinstance(checker, const):
+        return object if checker.value is True else None
+    if type(checker) is UnionTypeChecker:
+        target = tuple(map(_isinstance_target, checker.funcs))
+        if None in target:
+            return None
+    else:
+        target = _isinstance_target(checker)
+        if target is None:
+            return None
+    targets = target if isinstance(target, tuple) else (target,)
+    if all(
+        isinstance(t, type) and type(t).__instancecheck__ in _type_based_instancechecks
+        for t in targets
+    ):
+        return target
+    return None
+
+
+def _all_instances(values, target) -> bool:
+    """True if all `values` are instances of `target`, checking each distinct runtime type only once, or in constant
+    time for typed buffers (see `_buffer_element_type`).
+    A False result is inconclusive (e.g. instances with a spoofed __class__), and callers should fall back to a
+    per-element check"""
+    if target is object:
+        return True
+    elem_type = _buffer_element_type(values)
+    if elem_type is not None:
+        return not len(values) or issubclass(elem_type, target)
+    return all(issubclass(t, target) for t in set(map(type, values)))
+
+
+# runtime types of the elements of typed buffers, by array typecode and struct format character
+
+_array_typecode_types = {
+    **dict.fromkeys("bBhHiIlLqQ", int),
+    **dict.fromkeys("fd", float),
+    **dict.fromkeys("uw", str),
+}
+
+_struct_format_types = {
+    **dict.fromkeys("bBhHiIlLqQnNP", int),
+    **dict.fromkeys("efd", float),
+    "?": bool,
+    "c": bytes,
+}
+
+
+def _buffer_element_type(values):
+    """The runtime type shared by all elements of a 1-dimensional typed buffer (array.array, memoryview, or
+    numpy.ndarray if numpy has been imported), or None if `values` is not one or its element type can't be determined
+    from its typecode/format/dtype"""
+    if isinstance(values, array):
+        return _array_typecode_types.get(values.typecode)
+    if isinstance(values, memoryview):
+        if values.ndim != 1:
+            return None
+        return _struct_format_types.get(values.format.lstrip("@=<>!"))
+    # no need to import numpy if it hasn't been already; there can't be any arrays
+    numpy = sys.modules.get("numpy")
+    if (
+        numpy is not None
+        and isinstance(values, numpy.ndarray)
+        and values.ndim == 1
+        and not values.dtype.hasobject
+    ):
+        return values.dtype.type
+    return None
+
+
+def _budgeted(checker, max_elements, sample):
+    # checkers that don't support budgets are used as-is
+    budgeted = getattr(checker, "budgeted", None)
+    return checker if budgeted is None else budgeted(max_elements, sample)
+
+
+def _budget_for(max_elements, type_):
+    if max_elements is None or isinstance(max_elements, int):
+        return max_elements
+    # per-type budgets as a tuple of (type, budget) pairs
+    return next((n for t, n in max_elements if issubclass_generic(type_, t)), None)
+
+
 class _GenericTypeCheckerMixin:
     getter = staticmethod(type_checker_for)
+    # attributes holding the checkers for type args
+    child_attrs = ()
+
+    def budgeted(self, max_elements, sample=False):
+        """a copy of this checker with element budgets applied to all container checks in its tree"""
+        # bypass copy.copy; __new__ here requires the type args
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__)
+        for attr in self.child_attrs:
+            funcs = getattr(self, attr)
+            if isinstance(funcs, tuple):
+                funcs = tuple(_budgeted(f, max_elements, sample) for f in funcs)
+            else:
+                funcs = _budgeted(funcs, max_elements, sample)
+            setattr(new, attr, funcs)
+        return new
 
 
 class _GenericContainerTypeCheckerMixin(_GenericTypeCheckerMixin):
     reduce = all
     helper_cls = CollectionWrapper
     generic_type = object
+    max_elements = None
+    sample = False
+
+    def budgeted(self, max_elements, sample=False):
+        new = super().budgeted(max_elements, sample)
+        new.max_elements = _budget_for(max_elements, self.generic_type)
+        new.sample = sample
+        return new
+
+    def elements(self, values):
+        """the elements of the collection `values` to check, subject to the budget"""
+        n = self.max_elements
+        if n is None or len(values) <= n:
+            return values
+        if not self.sample:
+            return list(islice(values, n))
+        rng = getattr(_sampling, "rng", None) or random
+        if isinstance(values, collections.abc.Sequence):
+            return [values[i] for i in rng.sample(range(len(values)), n)]
+        return rng.sample(list(values), n)
 
     def __new__(cls, org, *args):
         if not args:
@@ -74,6 +353,7 @@ class _GenericContainerTypeCheckerMixin(_GenericTypeCheckerMixin):
 
 class _GenericUnionTypeCheckerMixin(_GenericTypeCheckerMixin):
     reduce = any
+    child_attrs = ("funcs",)
 
 
 @type_checker.register_all(typing.Any, str, typing.ByteString)
@@ -265,17 +545,56 @@ class TypeTypeChecker:
 @type_checker.register(typing.Collection)
 class CollectionTypeChecker(_GenericContainerTypeCheckerMixin, CollectionWrapper):
     helper_cls = CollectionWrapper
+    child_attrs = ("val_func",)
+
+    def __init__(self, coll_type, val_type=object):
+        super().__init__(coll_type, val_type)
+        self.val_target = _homogeneous_check_target(self.val_func)
+
+    def call_iter(self, arg):
+        arg = self.elements(arg)
+        target = self.val_target
+        if target is not None and _all_instances(arg, target):
+            # nothing left to check
+            return ()
+        return super().call_iter(arg)
 
 
 @type_checker.register(typing.Mapping)
 class MappingTypeChecker(_GenericContainerTypeCheckerMixin, MappingWrapper):
     helper_cls = MappingWrapper
     keyval_op = staticmethod(operator.and_)
+    child_attrs = ("keyfunc", "valfunc")
+
+    def __init__(self, coll_type, key_type, val_type):
+        super().__init__(coll_type, key_type, val_type)
+        self.key_target = _homogeneous_check_target(self.keyfunc)
+        self.val_target = _homogeneous_check_target(self.valfunc)
+
+    def call_iter(self, value):
+        if self.max_elements is not None and len(value) > self.max_elements:
+            value = dict(self.elements(value.items()))
+        key_target, val_target = self.key_target, self.val_target
+        keys_ok = key_target is not None and _all_instances(value.keys(), key_target)
+        vals_ok = val_target is not None and _all_instances(
+            value.values(), val_target
+        )
+        if keys_ok:
+            return () if vals_ok else map(self.valfunc, value.values())
+        elif vals_ok:
+            return map(self.keyfunc, value.keys())
+        return super().call_iter(value)
 
 
 @type_checker.register(typing.Tuple)
 class TupleTypeChecker(_GenericContainerTypeCheckerMixin, TupleWrapper):
     helper_cls = TupleWrapper
+    child_attrs = ("funcs",)
+
+    def call_iter(self, arg):
+        if not self.require_same_len:
+            arg = self.elements(arg)
+        return super().call_iter(arg)
 
     def __call__(self, value):
         if not isinstance(value, self.generic_type):
@@ -326,3 +645,243 @@ class PatternTypeChecker(_TypeAliasTypeChecker):
 @type_checker.register(typing.Match)
 class MatchTypeChecker(_TypeAliasTypeChecker):
     attr = "string"
+
+
+# compilation of type checker trees into flat, specialized functions
+
+
+def _concrete_target(type_):
+    # isinstance checks against typing aliases delegate to their concrete origin; skip the indirection
+    t = to_concrete_type(type_)
+    return t if isinstance(t, type) else type_
+
+
+def _is_true_const(checker):
+    return isinstance(checker, const) and checker.value is True
+
+
+def _tuple_len_error(checker, value):
+    raise ValueError(
+        "{} expected a collection of {} values for type {} but received {}".format(
+            checker, len(checker.funcs), checker.type_, value
+        )
+    )
+
+
+class _TypeCheckerCompiler:
+    """Generates python source for a single function equivalent to a tree of type checkers as constructed by
+    `type_checker`. Collection, mapping and tuple checks are inlined as nested loops with early exits, leaf
+    isinstance checks are inlined with their target types bound as closure variables, and any other checker is bound
+    and called as-is, so that the compiled function always agrees with the tree it was compiled from.
+    """
+
+    inlined_types = (CollectionTypeChecker, MappingTypeChecker, TupleTypeChecker)
+
+    def __init__(self):
+        self.namespace = {
+            "isinstance": isinstance,
+            "len": len,
+            "_AllFailed": AllFailed,
+            "_all_instances": _all_instances,
+            "_tuple_len_error": _tuple_len_error,
+        }
+        self.names = {}
+        self.funcs = []
+        self.n = 0
+
+    def fresh(self, prefix):
+        self.n += 1
+        return "{}{}".format(prefix, self.n)
+
+    def bind(self, obj, prefix="_c"):
+        key = (prefix, id(obj))
+        name = self.names.get(key)
+        if name is None:
+            name = self.names[key] = self.fresh(prefix)
+            self.namespace[name] = obj
+        return name
+
+    def expr(self, checker, var):
+        """a python expression applying `checker` to `var`, or None if `checker` should be inlined as statements"""
+        if _is_true_const(checker):
+            return "True"
+        if isinstance(checker, const):
+            return self.bind(checker.value)
+        target = _isinstance_target(checker)
+        if target is not None:
+            return "isinstance({}, {})".format(var, self.bind(target, "_t"))
+        if type(checker) is UnionTypeChecker:
+            targets = tuple(map(_isinstance_target, checker.funcs))
+            if None not in targets:
+                return "isinstance({}, {})".format(var, self.bind(targets, "_t"))
+            return "{}({})".format(self.function(checker), var)
+        if type(checker) in self.inlined_types and checker.max_elements is None:
+            return None
+        return "{}({})".format(self.bind(checker), var)
+
+    def call_expr(self, checker, var):
+        """like `expr`, but compiles a separate function for checkers that would otherwise be inlined"""
+        e = self.expr(checker, var)
+        return "{}({})".format(self.function(checker), var) if e is None else e
+
+    def stmts(self, checker, var, indent):
+        """statements returning False from the enclosing function when `checker` fails on `var`"""
+        e = self.expr(checker, var)
+        if e == "True":
+            return []
+        if e is not None:
+            return [indent + "if not {}:".format(e), indent + "    return False"]
+
+        target = self.bind(_concrete_target(checker.generic_type), "_t")
+        lines = [
+            indent + "if not isinstance({}, {}):".format(var, target),
+            indent + "    return False",
+        ]
+        inner = indent + "    "
+        if type(checker) is CollectionTypeChecker:
+            lines.extend(self.loop(checker.val_func, var, indent))
+        elif type(checker) is MappingTypeChecker:
+            keyfunc, valfunc = checker.keyfunc, checker.valfunc
+            if _is_true_const(keyfunc):
+                lines.extend(self.loop(valfunc, var + ".values()", indent))
+            elif _is_true_const(valfunc):
+                lines.extend(self.loop(keyfunc, var, indent))
+            else:
+                k, x = self.fresh("_k"), self.fresh("_x")
+                key_target = _homogeneous_check_target(keyfunc)
+                val_target = _homogeneous_check_target(valfunc)
+                if key_target is not None and val_target is not None:
+                    lines.append(
+                        indent
+                        + "if not (_all_instances({v}.keys(), {}) and _all_instances({v}.values(), {})):".format(
+                            self.bind(key_target, "_t"),
+                            self.bind(val_target, "_t"),
+                            v=var,
+                        )
+                    )
+                    indent, inner = inner, inner + "    "
+                lines.append(indent + "for {}, {} in {}.items():".format(k, x, var))
+                if (
+                    isinstance(valfunc, const)
+                    or _isinstance_target(valfunc) is not None
+                ):
+                    # the value check can't raise, so checking the key first can't change the outcome
+                    lines.extend(self.stmts(keyfunc, k, inner))
+                    lines.extend(self.stmts(valfunc, x, inner))
+                else:
+                    # the checker evaluates both key and value checks before reducing; preserve that in case the
+                    # value check raises
+                    ok = self.fresh("_ok")
+                    lines.append(
+                        inner + "{} = {}".format(ok, self.call_expr(keyfunc, k))
+                    )
+                    lines.extend(self.stmts(valfunc, x, inner))
+                    lines.extend(
+                        [inner + "if not {}:".format(ok), inner + "    return False"]
+                    )
+        elif not checker.require_same_len:
+            lines.extend(self.loop(checker.funcs[0], var, indent))
+        else:
+            xs = [self.fresh("_x") for _ in checker.funcs]
+            lines.extend(
+                [
+                    indent + "if len({}) != {}:".format(var, len(xs)),
+                    indent
+                    + "    _tuple_len_error({}, {})".format(self.bind(checker), var),
+                    indent + "{}, = {}".format(", ".join(xs), var),
+                ]
+            )
+            for f, x in zip(checker.funcs, xs):
+                lines.extend(self.stmts(f, x, indent))
+        return lines
+
+    def loop(self, checker, iterable, indent):
+        x = self.fresh("_x")
+        target = _homogeneous_check_target(checker)
+        if target is None:
+            body = self.stmts(checker, x, indent + "    ")
+            return [indent + "for {} in {}:".format(x, iterable), *body] if body else []
+        if target is object:
+            return []
+        # check distinct types first and only fall back to the element-wise loop if that's inconclusive
+        inner = indent + "    "
+        return [
+            indent
+            + "if not _all_instances({}, {}):".format(
+                iterable, self.bind(target, "_t")
+            ),
+            inner + "for {} in {}:".format(x, iterable),
+            *self.stmts(checker, x, inner + "    "),
+        ]
+
+    def function(self, checker):
+        """compile `checker` to a standalone function and return its name"""
+        key = ("_check", id(checker))
+        name = self.names.get(key)
+        if name is not None:
+            return name
+        name = self.names[key] = self.fresh("_check")
+        indent = "    "
+        lines = ["def {}(value):".format(name)]
+        if type(checker) is UnionTypeChecker:
+            # same semantics as UnionWrapper.call_iter reduced with `any`
+            lines.extend([indent + "_errs = []", indent + "_ok = False"])
+            for f in checker.funcs:
+                lines.extend(
+                    [
+                        indent + "try:",
+                        indent + "    _r = {}".format(self.call_expr(f, "value")),
+                        indent + "except Exception as _e:",
+                        indent + "    _errs.append(_e)",
+                        indent + "else:",
+                        indent + "    if _r:",
+                        indent + "        return True",
+                        indent + "    _ok = True",
+                    ]
+                )
+            lines.extend(
+                [
+                    indent + "if not _ok:",
+                    indent + "    raise _AllFailed(*_errs)",
+                    indent + "return False",
+                ]
+            )
+        else:
+            e = self.expr(checker, "value")
+            if e is None:
+                lines.extend(self.stmts(checker, "value", indent))
+                lines.append(indent + "return True")
+            else:
+                lines.append(indent + "return " + e)
+        self.funcs.append(lines)
+        return name
+
+    def compile(self, checker, type_=None):
+        name = self.function(checker)
+        names = list(self.namespace)
+        lines = ["def _factory({}):".format(", ".join(names))]
+        for func in self.funcs:
+            lines.extend("    " + line for line in func)
+        lines.append("    return {}".format(name))
+        source = "\n".join(lines)
+
+        filename = "<compiled type checker for {}>".format(
+            checker if type_ is None else type_
+        )
+        globals_ = {}
+        exec(compile(source, filename, "exec"), globals_)
+        f = globals_["_factory"](*(self.namespace[n] for n in names))
+        f.__source__ = source
+        return f
+
+
+def compile_type_checker(checker, type_=None):
+    """Compile a type checker as returned by `type_checker` into a single specialized python function with the same
+    semantics. Nested collection checks become inlined loops with early exits rather than a tree of generators and
+    bound method calls, which matters when validating large values"""
+    return _TypeCheckerCompiler().compile(checker, type_)
+
+
+@weak_lru_cache(maxsize=2**12)
+def compiled_type_checker_for(type_):
+    return compile_type_checker(type_checker_for(type_), type_)
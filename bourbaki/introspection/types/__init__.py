@@ -44,7 +44,13 @@ from .evaluation import (
     constraint_type,
     get_param_dict,
 )
-from .issubclass_generic_ import issubclass_generic, reparameterized_bases
+from .issubclass_generic_ import (
+    issubclass_generic,
+    reparameterized_bases,
+    generic_mro,
+)
+from .interning import TypeNode, intern_type
+from .subtype_matrix import SubtypeMatrix
 from .abcs import Builtin, BuiltinAtomic, LazyType, NamedTupleABC, PseudoGenericMeta
 from .abcs import (
     NonStrCollection,
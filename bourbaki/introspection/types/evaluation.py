@@ -1,12 +1,18 @@
 # coding:utf-8
 from typing import Dict, TypeVar, Union, Type, Optional, Mapping, Any, NewType
 from collections import OrderedDict
-from functools import singledispatch, lru_cache
+from functools import singledispatch
+from importlib import import_module
 from itertools import repeat
+from threading import RLock
+import ast
+import builtins
+import sys
 from typing_inspect import get_constraints, get_bound
 from .compat import get_generic_origin, get_generic_params, EVALUATE_DEFAULT
 from .compat import ForwardRef, CallableSignature
 from .abcs import LazyType, PseudoGenericMeta
+from ..caches import CacheInfo, register_cache, weak_lru_cache
 from ..debug import trace
 from .inspection import (
     is_callable_origin,
@@ -49,8 +55,9 @@ def fully_concretize_type(
 
 def get_globals(t: Type) -> Optional[Dict[str, Any]]:
     try:
-        mod = __import__(t.__module__)
-    except (AttributeError, ImportError):
+        name = t.__module__
+        mod = sys.modules.get(name) or import_module(name)
+    except (AttributeError, ImportError, TypeError, ValueError):
         return None
     else:
         return getattr(mod, "__dict__", None)
@@ -59,14 +66,137 @@ def get_globals(t: Type) -> Optional[Dict[str, Any]]:
 # materialize delayed string references (forward refs) in type annotations
 
 
+class _ForwardRefCache:
+    """Compiled code and evaluated results of forward reference strings, the latter keyed by the identity of the
+    namespace they were evaluated in. A result is reused only while every name referenced by the string, and every
+    attribute chain on one (e.g. `mod.User`), resolves to the same object in the namespace (or builtins) as when it
+    was evaluated. Results of strings involving anything else (e.g. calls) aren't cached. Both mappings are bounded by
+    `maxsize`, evicting the oldest entries first."""
+
+    def __init__(self, maxsize: int = 2**12):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        # source -> (code object, the name and attribute chains it references or None if results can't be cached)
+        self._code = {}
+        # (id of namespace, source) -> (namespace, ((chain, resolved value), ...), result)
+        self._results = {}
+        self._lock = RLock()
+        register_cache(self, "{}.eval_forward_refs".format(__name__))
+
+    def eval(self, source: str, globals_: Optional[Dict[str, Any]]):
+        compiled = self._code.get(source)
+        if compiled is None:
+            tree = ast.parse(source, "<forward reference>", "eval")
+            compiled = (
+                compile(tree, "<forward reference>", "eval"),
+                _name_chains(tree),
+            )
+            with self._lock:
+                self._insert(self._code, source, compiled)
+        code, chains = compiled
+        if globals_ is None or chains is None:
+            return eval(code, globals_)
+
+        key = (id(globals_), source)
+        entry = self._results.get(key)
+        if (
+            entry is not None
+            and entry[0] is globals_
+            and all(_resolve_chain(globals_, c) is value for c, value in entry[1])
+        ):
+            self.hits += 1
+            return entry[2]
+
+        self.misses += 1
+        result = eval(code, globals_)
+        bindings = tuple((c, _resolve_chain(globals_, c)) for c in chains)
+        with self._lock:
+            self._insert(self._results, key, (globals_, bindings, result))
+        return result
+
+    def _insert(self, mapping, key, value):
+        mapping[key] = value
+        while len(mapping) > self.maxsize:
+            del mapping[next(iter(mapping))]
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._results))
+
+    def cache_clear(self):
+        with self._lock:
+            self._code.clear()
+            self._results.clear()
+            self.hits = self.misses = 0
+
+    def resize(self, maxsize: int):
+        with self._lock:
+            self.maxsize = maxsize
+            for mapping in (self._code, self._results):
+                while len(mapping) > maxsize:
+                    del mapping[next(iter(mapping))]
+
+    def cache_mappings(self):
+        return self._code, self._results
+
+
+_missing = object()
+
+# expression nodes whose values depend only on the names they reference, e.g. List["mod.User"] or int | str
+_cacheable_nodes = (
+    ast.Expression,
+    ast.Subscript,
+    ast.Tuple,
+    ast.List,
+    ast.Constant,
+    ast.BinOp,
+    ast.operator,
+    ast.expr_context,
+)
+
+
+def _name_chains(tree: ast.AST) -> Optional[tuple]:
+    """the names and attribute chains on names (as tuples of names) referenced in a parsed expression, or None if
+    its value may depend on anything else"""
+    chains = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            chain = []
+            while isinstance(node, ast.Attribute):
+                chain.append(node.attr)
+                node = node.value
+            if not isinstance(node, ast.Name):
+                return None
+            chain.append(node.id)
+            chains.add(tuple(reversed(chain)))
+        elif isinstance(node, ast.Name):
+            chains.add((node.id,))
+        elif not isinstance(node, _cacheable_nodes):
+            return None
+    return tuple(chains)
+
+
+def _resolve_chain(globals_: Dict[str, Any], chain: tuple):
+    obj = globals_.get(chain[0], _missing)
+    if obj is _missing:
+        obj = builtins.__dict__.get(chain[0], _missing)
+    for attr in chain[1:]:
+        if obj is _missing:
+            break
+        obj = getattr(obj, attr, _missing)
+    return obj
+
+
+_forward_ref_cache = _ForwardRefCache()
+
+
 def eval_forward_refs(t, globals_, dont_recurse=()):
     if t in dont_recurse:
         return t
 
     if isinstance(t, ForwardRef):
-        return eval(t.__forward_arg__, globals_)
+        return _forward_ref_cache.eval(t.__forward_arg__, globals_)
     elif isinstance(t, str):
-        return eval(t, globals_)
+        return _forward_ref_cache.eval(t, globals_)
     elif globals_ is None:
         globals_ = get_globals(t)
 
@@ -137,9 +267,9 @@ def _eval_type_tree_signature(sig):
     return list(map(eval_type_tree, sig))
 
 
-@lru_cache(None)
+@weak_lru_cache(maxsize=None, clearable=False)
 def _cached_newtype(newtype, name, type_, id_):
-    # id_ is here only to ensure distinctness of otherwise-identically-defined NewTypes, via the lru cache
+    # id_ is here only to ensure distinctness of otherwise-identically-defined NewTypes, via the cache
     # in case we're reconstructing a type that was deconstructed in the same runtime, we check the _newtype_cache first
     return _newtype_cache.get(id_, newtype(name, reconstruct_generic(type_)))
 
@@ -174,7 +304,8 @@ def constraint_type(tvar: TypeVar):
         return object if bound is None else bound
 
 
-@lru_cache(None)
+# unbounded and not cleared: evicting an entry would produce a distinct class for the same args on the next call
+@weak_lru_cache(maxsize=None, clearable=False)
 def new_namedtuple_subclass(org, args):
     if args:
         annotations = OrderedDict(zip(org._fields, args))
@@ -235,7 +366,7 @@ def concretize_typevars_signature(type: tuple, dont_recurse=()):
 # turn a fully evaluated generic type into a (generic, *args) tuple
 
 
-@lru_cache(None)
+@weak_lru_cache(maxsize=2**14)
 def deconstruct_generic(t):
     if isinstance(t, TypeVar):
         return t
@@ -1,7 +1,7 @@
 # coding: utf-8
 from typing import TypeVar, Generic
 import typing
-from functools import singledispatch, lru_cache
+from functools import singledispatch
 from collections import abc as collections_abc
 from typing_inspect import get_args
 from .compat import (
@@ -19,6 +19,7 @@ from .compat import (
     NON_TYPING_STDLIB_MODULES,
     NEW_TYPING,
 )
+from ..caches import weak_lru_cache
 from ..debug import trace
 
 # Note: ideally, get_generic_args would be defined in compat, but we define it here because it requires access to
@@ -70,7 +71,7 @@ def newtype_chain(t):
         next_ = getattr(next_, "__supertype__", sentinel)
 
 
-@lru_cache(None)
+@weak_lru_cache(maxsize=2**12)
 def is_named_tuple_class(cls: type):
     try:
         mro = cls.mro()
@@ -0,0 +1,127 @@
+# coding:utf-8
+import types
+import typing
+from functools import partial
+from threading import RLock
+from weakref import ref, WeakValueDictionary
+from .compat import get_generic_origin
+from .inspection import get_generic_args
+
+# origins whose args compare as sets
+_unordered_origins = (typing.Union, typing.Literal)
+
+_missing = object()
+
+
+class TypeNode:
+    """Canonical node for a type expression, as returned by intern_type. Equal type expressions are interned to the
+    identical node, so that nodes compare by identity and hash in constant time, making them cheap cache keys however
+    deeply nested the types they represent. `type` is the first type expression interned to the node; `children` are
+    the nodes of its parameters (or elements, for tuple type trees), and `origin` and `args` are computed once, as by
+    get_generic_origin and get_generic_args."""
+
+    __slots__ = (
+        "type",
+        "children",
+        "ordered",
+        "_hash",
+        "_origin",
+        "_args",
+        "__weakref__",
+    )
+
+    def __init__(self, type_, children, hash_, ordered=False):
+        self.type = type_
+        self.children = children
+        self.ordered = ordered
+        self._hash = hash_
+        self._origin = self._args = _missing
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return intern_type, (self.type, self.ordered)
+
+    @property
+    def origin(self):
+        origin = self._origin
+        if origin is _missing:
+            origin = self._origin = get_generic_origin(self.type)
+        return origin
+
+    @property
+    def args(self) -> tuple:
+        args = self._args
+        if args is _missing:
+            args = self._args = tuple(get_generic_args(self.type))
+        return args
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.type)
+
+
+# structural key -> node; nodes live as long as something outside this module references them
+_nodes = WeakValueDictionary()
+# id of type expression -> (weak ref to it, weak ref to its node), for interning the same expression in constant time;
+# one for each of unordered and ordered interning
+_nodes_by_id = {}
+_ordered_nodes_by_id = {}
+_lock = RLock()
+
+
+def intern_type(t, ordered: bool = False) -> TypeNode:
+    """The canonical TypeNode for a type expression: a class, generic alias, union, forward ref, literal arg, or a
+    tuple type tree such as (Mapping, str, int), nested to any depth. Nodes are held weakly here; callers that want
+    interning to stay constant-time should keep them (e.g. as cache keys).
+    Union and Literal args are unordered, as for type equality, unless `ordered` is True, in which case e.g.
+    Union[int, str] and Union[str, int] get distinct nodes."""
+    nodes_by_id = _ordered_nodes_by_id if ordered else _nodes_by_id
+    entry = nodes_by_id.get(id(t))
+    if entry is not None and entry[0]() is t:
+        node = entry[1]()
+        if node is not None:
+            return node
+
+    children, key = _structure(t, ordered)
+    with _lock:
+        node = _nodes.get(key)
+        if node is None:
+            node = _nodes[key] = TypeNode(t, children, hash(key), ordered)
+    if children:
+        # leaves are looked up by value directly; only memoize the structured expressions
+        try:
+            nodes_by_id[id(t)] = (
+                ref(t, partial(_forget, nodes_by_id, id(t))),
+                ref(node),
+            )
+        except TypeError:
+            # e.g. types.UnionType isn't weak-referenceable
+            pass
+    return node
+
+
+def _structure(t, ordered):
+    kind = type(t)
+    intern = partial(intern_type, ordered=ordered) if ordered else intern_type
+    if kind is tuple or kind is list:
+        children = tuple(map(intern, t))
+        return children, (kind, children)
+    args = getattr(t, "__args__", None) if kind is not type else None
+    if not args or type(args) is not tuple:
+        # classes, TypeVars, forward refs, unparameterized aliases and literal values; keyed by type and value so that
+        # e.g. Literal[1] and Literal[True] are distinguished
+        return (), (kind, t)
+    origin = getattr(t, "__origin__", None)
+    children = tuple(map(intern, args))
+    if not ordered and (origin in _unordered_origins or kind is types.UnionType):
+        args_key = frozenset(children)
+    else:
+        args_key = children
+    return children, (kind, origin, args_key, getattr(t, "__metadata__", None))
+
+
+def _forget(nodes_by_id, id_, weakref):
+    entry = nodes_by_id.get(id_)
+    if entry is not None and entry[0] is weakref:
+        del nodes_by_id[id_]
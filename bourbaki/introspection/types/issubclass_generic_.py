@@ -2,7 +2,6 @@
 from typing import List, Generic, Tuple, TypeVar, Union
 import typing
 import sys
-from functools import lru_cache
 from inspect import getmro, signature, Signature, Parameter
 from itertools import repeat, islice
 import types
@@ -25,6 +24,7 @@ from .compat import (
     EVALUATE_DEFAULT,
 )
 from .evaluation import concretize_typevars, reparameterize_generic
+from ..caches import weak_lru_cache
 from ..debug import trace
 
 T_co = TypeVar("T_co", covariant=True)
@@ -86,9 +86,35 @@ def reparameterized_bases(
             )
 
 
-@lru_cache(None)
+@weak_lru_cache(maxsize=2**14)
+def generic_mro(t, concretize: bool = False) -> tuple:
+    """The generic bases of `t`, reparameterized with its type args, transitively and in the order they're generated
+    by reparameterized_bases; materialized once per type. Classes are referenced weakly by the cache.
+    """
+    return tuple(reparameterized_bases(t, concretize=concretize))
+
+
+# optional second-level cache consulted on misses; see bourbaki.introspection.persistent_cache
+_persistent_cache = None
+
+
+def set_persistent_cache(cache):
+    """install a persistent cache for issubclass_generic, returning the previous one"""
+    global _persistent_cache
+    previous, _persistent_cache = _persistent_cache, cache
+    return previous
+
+
+@weak_lru_cache(maxsize=2**16)
 @trace
 def issubclass_generic(t1: Union[type, tuple], t2: Union[type, tuple]) -> bool:
+    persistent = _persistent_cache
+    if persistent is not None:
+        return persistent.get(t1, t2, _issubclass_generic)
+    return _issubclass_generic(t1, t2)
+
+
+def _issubclass_generic(t1, t2) -> bool:
     if is_newtype(t1):
         if is_newtype(t2):
             return _issubclass_newtype_newtype(t1, t2)
@@ -165,7 +191,7 @@ def _is_generic(t):
     return Generic in reversed(mro)
 
 
-@lru_cache(None)
+@weak_lru_cache(maxsize=2**14)
 @trace
 def _issubclass(t1, t2):
     # concrete types; handles Any
@@ -230,8 +256,7 @@ def _issubclass_parameterized_general(org1, args1, org2, args2):
 
     ttup1, ttup2 = (org1, *args1), (org2, *args2)
     return _issubclass(org1, org2) and any(
-        issubclass_generic(base, ttup2)
-        for base in reparameterized_bases(ttup1, concretize=True)
+        issubclass_generic(base, ttup2) for base in generic_mro(ttup1, concretize=True)
     )
 
 
@@ -0,0 +1,130 @@
+# coding:utf-8
+from typing import Iterable, Iterator, List
+from threading import RLock
+from .interning import intern_type
+from .issubclass_generic_ import issubclass_generic
+
+
+class SubtypeMatrix:
+    """The subtype relation over a closed universe of types, as given by issubclass_generic, computed once and stored
+    as packed bitsets (one int per type, for each of its supertypes and subtypes), so that subtype queries are bit
+    tests and queries over many types are bitwise operations. Types may be added incrementally.
+    If `transitive` is True, the relation already computed is used to skip the issubclass_generic calls implied by
+    transitivity when a type is added. That saves most of the work for large universes, but issubclass_generic isn't
+    transitive in every case (e.g. where Any or variadic tuples are involved), so the result may then differ from
+    direct queries; by default every pair is computed."""
+
+    def __init__(self, types: Iterable = (), transitive: bool = False):
+        self.transitive = transitive
+        self._types = []
+        # interned type node -> index
+        self._index = {}
+        # index -> bitset of the indices of its supertypes/subtypes, including itself
+        self._supers = []
+        self._subs = []
+        self._lock = RLock()
+        self.update(types)
+
+    def __len__(self):
+        return len(self._types)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._types)
+
+    def __contains__(self, t):
+        return intern_type(t) in self._index
+
+    def update(self, types: Iterable):
+        for t in types:
+            self.add(t)
+
+    def add(self, t) -> int:
+        """add a type to the universe if not already present, returning its index"""
+        node = intern_type(t)
+        with self._lock:
+            ix = self._index.get(node)
+            if ix is not None:
+                return ix
+
+            types, supers, subs = self._types, self._supers, self._subs
+            if self.transitive:
+                sup, sub = self._related_transitive(t)
+            else:
+                sup = sub = 0
+                for j, u in enumerate(types):
+                    if issubclass_generic(t, u):
+                        sup |= 1 << j
+                    if issubclass_generic(u, t):
+                        sub |= 1 << j
+
+            ix = len(types)
+            bit = 1 << ix
+            for j in _indices(sup):
+                subs[j] |= bit
+            for j in _indices(sub):
+                supers[j] |= bit
+            supers.append(sup | bit)
+            subs.append(sub | bit)
+            types.append(t)
+            self._index[node] = ix
+        return ix
+
+    def _related_transitive(self, t):
+        supers, subs = self._supers, self._subs
+        sup = sub = known_sup = known_sub = 0
+        for j, u in enumerate(self._types):
+            bit = 1 << j
+            if not known_sup & bit:
+                if issubclass_generic(t, u):
+                    sup |= supers[j]
+                    known_sup |= supers[j]
+                else:
+                    # t can't be a subtype of any subtype of u
+                    known_sup |= subs[j]
+            if not known_sub & bit:
+                if issubclass_generic(u, t):
+                    sub |= subs[j]
+                    known_sub |= subs[j]
+                else:
+                    # no supertype of u can be a subtype of t
+                    known_sub |= supers[j]
+        return sup, sub
+
+    def index(self, t) -> int:
+        ix = self._index.get(intern_type(t))
+        if ix is None:
+            raise KeyError("{} is not in {}".format(t, self))
+        return ix
+
+    def is_subtype(self, t1, t2) -> bool:
+        return bool(self._supers[self.index(t1)] >> self.index(t2) & 1)
+
+    def supertypes(self, t) -> List:
+        """all supertypes of `t` in the universe, including `t` itself, in order of addition"""
+        return self._types_of(self._supers[self.index(t)])
+
+    def subtypes(self, t) -> List:
+        """all subtypes of `t` in the universe, including `t` itself, in order of addition"""
+        return self._types_of(self._subs[self.index(t)])
+
+    def common_supertypes(self, *types) -> List:
+        """all types in the universe which are supertypes of every one of `types`"""
+        supers = self._supers
+        bits = -1
+        for t in types:
+            bits &= supers[self.index(t)]
+        return self._types_of(bits if types else 0)
+
+    def _types_of(self, bits: int) -> List:
+        types = self._types
+        return [types[i] for i in _indices(bits)]
+
+    def __repr__(self):
+        return "{}(<{} types>)".format(type(self).__name__, len(self))
+
+
+def _indices(bits: int) -> Iterator[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
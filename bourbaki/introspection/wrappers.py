@@ -1,6 +1,7 @@
 # coding:utf-8
 from inspect import signature, Parameter
 from functools import update_wrapper, lru_cache
+from threading import RLock
 from .callables import name_of
 
 empty = Parameter.empty
@@ -18,12 +19,17 @@ def lru_cache_sig_preserving(*args, **kwargs):
 
 def cached_getter(method):
     attr = "_" + name_of(method)
+    # held only on first access, so that the method is called once per instance even when raced by other threads
+    lock = RLock()
 
     def getter(self):
         val = getattr(self, attr, empty)
         if val is empty:
-            val = method(self)
-            setattr(self, attr, val)
+            with lock:
+                val = getattr(self, attr, empty)
+                if val is empty:
+                    val = method(self)
+                    setattr(self, attr, val)
         return val
 
     return getter
@@ -0,0 +1,184 @@
+# coding:utf-8
+import gc
+import pickle
+import typing
+from typing import Dict, List, Tuple, Union
+import pytest
+from bourbaki.introspection.caches import (
+    WeakLRUCache,
+    weak_lru_cache,
+    registered_caches,
+    cache_stats,
+    clear_caches,
+    resize_caches,
+)
+
+
+def make_cache(maxsize=None, weak=True):
+    calls = []
+
+    @weak_lru_cache(maxsize, weak)
+    def f(*args):
+        calls.append(len(args))
+        return len(calls)
+
+    return f, calls
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        (int, float),
+        (List[int],),
+        (Dict[str, Tuple[int, ...]], Union[int, str]),
+        (list[int], int | None),
+        ((1, 2), "foo"),
+    ],
+)
+def test_weak_lru_cache_hits(args):
+    f, calls = make_cache()
+    value = f(*args)
+    assert f(*args) == value
+    assert len(calls) == 1
+    assert f.cache_info() == (1, 1, None, 1)
+
+
+def test_weak_lru_cache_evicts_least_recently_used():
+    f, calls = make_cache(maxsize=2)
+    f(1)
+    f(2)
+    f(1)
+    f(3)
+    assert len(f) == 2
+    f(1)
+    assert len(calls) == 3
+    f(2)
+    assert len(calls) == 4
+
+
+def test_weak_lru_cache_resize():
+    f, calls = make_cache()
+    for i in range(10):
+        f(i)
+    f.resize(3)
+    assert len(f) == 3
+    f(9)
+    assert len(calls) == 10
+    f(0)
+    assert len(calls) == 11
+
+
+def make_class_and_alias():
+    class A:
+        pass
+
+    return A, List[Tuple[int, A]]
+
+
+@pytest.mark.parametrize("weak", [True, False])
+def test_weak_lru_cache_releases_classes(weak):
+    f, calls = make_cache(weak=weak)
+    A, alias = make_class_and_alias()
+    f(A, int)
+    f(alias)
+    f(int, float)
+    assert len(f) == 3
+    # typing keeps its own cache of aliases; clear it so that only ours could keep A alive
+    for clear in typing._cleanups:
+        clear()
+    del A, alias
+    gc.collect()
+    assert len(f) == (1 if weak else 3)
+
+
+def test_weak_lru_cache_keys_aliases_by_value():
+    f, calls = make_cache()
+    A, alias = make_class_and_alias()
+    f(alias)
+    f(List[Tuple[int, A]])
+    assert len(calls) == 1
+
+
+def test_weak_lru_cache_wraps():
+    cache = WeakLRUCache(make_class_and_alias, 10)
+    assert cache.__name__ == make_class_and_alias.__name__
+    assert cache.__wrapped__ is make_class_and_alias
+
+
+def test_registry_includes_library_caches():
+    names = {name for name, _ in registered_caches()}
+    assert (
+        "bourbaki.introspection.types.issubclass_generic_.issubclass_generic" in names
+    )
+    assert "bourbaki.introspection.typechecking.type_checker_for" in names
+    assert "GenericTypeLevelSingleDispatch('type_checker')" in names
+
+
+@pytest.fixture
+def restore_cache_sizes():
+    # resize_caches() applies to the library's own caches too; don't let that leak into other tests
+    sizes = [
+        (cache, cache.cache_info().maxsize)
+        for _, cache in registered_caches()
+        if hasattr(cache, "resize")
+    ]
+    yield
+    for cache, maxsize in sizes:
+        cache.resize(maxsize)
+
+
+def test_registry_stats_clear_and_resize(restore_cache_sizes):
+    f, calls = make_cache(maxsize=8)
+    g, _ = make_cache()
+    for i in range(8):
+        f((i, i))
+        g(i)
+    caches = [cache for _, cache in registered_caches()]
+    stat = cache_stats()[caches.index(f)]
+    assert stat.name == f.__module__ + "." + f.__qualname__
+    assert (stat.misses, stat.maxsize, stat.currsize) == (8, 8, 8)
+    assert stat.nbytes > 0
+
+    resize_caches(factor=0.5)
+    assert f.cache_info().maxsize == 4
+    assert len(f) == 4
+    # unbounded caches are left unbounded
+    assert g.cache_info().maxsize is None
+    resize_caches(16)
+    assert f.cache_info().maxsize == 16
+
+    clear_caches()
+    assert len(f) == len(g) == 0
+    assert f.cache_info().misses == 0
+    with pytest.raises(ValueError):
+        resize_caches()
+
+
+def test_registry_holds_caches_weakly():
+    f, _ = make_cache()
+    gc.collect()
+    n = len(registered_caches())
+    del f
+    gc.collect()
+    assert len(registered_caches()) == n - 1
+
+
+def test_clear_caches_skips_unclearable():
+    f, calls = make_cache()
+    g = weak_lru_cache(clearable=False)(lambda x: [x])
+    f(1)
+    value = g(1)
+    clear_caches()
+    assert len(f) == 0
+    assert g(1) is value
+    assert g.cache_info().hits == 1
+    g.cache_clear()
+    assert len(g) == 0
+
+
+def test_weak_lru_cache_is_a_picklable_function():
+    from bourbaki.introspection.typechecking import type_checker_for
+
+    f, _ = make_cache()
+    assert len(f) == 0 and bool(f)
+    assert pickle.loads(pickle.dumps(type_checker_for)) is type_checker_for
@@ -1,11 +1,21 @@
 import io
+import itertools
+import numbers
 import pickle
 import typing
 
 from graphviz import Digraph
 import pytest
 
-from bourbaki.introspection.generic_dispatch import GenericTypeLevelSingleDispatch
+from bourbaki.introspection.generic_dispatch import (
+    GenericTypeLevelDispatch,
+    GenericTypeLevelSingleDispatch,
+    refines,
+    most_refined,
+    _args_key,
+)
+from bourbaki.introspection.types import intern_type
+from bourbaki.introspection.wrappers import const
 
 type_repr = GenericTypeLevelSingleDispatch("type_repr", isolated_bases=[typing.Union])
 
@@ -90,3 +100,221 @@ def test_type_repr(t, repr_):
 def test_viz(t):
     g = type_repr.visualize(t, view=False, title="resolution for {}".format(t))
     assert isinstance(g, Digraph)
+
+
+pair_dispatch = GenericTypeLevelDispatch("pair_dispatch")
+pair_dispatch_types = [
+    object,
+    int,
+    bool,
+    numbers.Real,
+    str,
+    typing.Union[int, str],
+    typing.Collection[int],
+    typing.List[object],
+    typing.Tuple[int, ...],
+    typing.Mapping[str, int],
+]
+for i, sig in enumerate(itertools.product(pair_dispatch_types, repeat=2)):
+    if i % 3 == 0:
+        pair_dispatch.insert(sig, const(sig))
+
+
+@pytest.mark.parametrize(
+    "sig",
+    list(
+        itertools.product(
+            pair_dispatch_types + [float, typing.Any, typing.Dict[str, bool]], repeat=2
+        )
+    ),
+)
+def test_resolution_agrees_with_exhaustive_search(sig):
+    exhaustive = [s for s in pair_dispatch.funcs if refines(sig, s)]
+    assert pair_dispatch._resolve(sig) == most_refined(exhaustive)
+
+
+@pytest.mark.parametrize("dispatcher", [pair_dispatch, type_repr])
+def test_dag_is_transitive_reduction(dispatcher):
+    networkx = pytest.importorskip("networkx")
+    full = networkx.DiGraph()
+    full.add_nodes_from(dispatcher.funcs)
+    for sig1, sig2 in itertools.combinations(dispatcher.funcs, 2):
+        if refines(sig1, sig2):
+            full.add_edge(sig1, sig2)
+        elif refines(sig2, sig1):
+            full.add_edge(sig2, sig1)
+    dag = dispatcher.dag()
+    assert set(dag.edges) == set(networkx.transitive_reduction(full).edges)
+    assert list(dag) == list(dispatcher.funcs)
+
+
+def test_late_registration_invalidates_affected_resolutions():
+    dispatch = GenericTypeLevelDispatch("late")
+    dispatch.insert((object,), const("object"))
+    dispatch.insert((numbers.Number,), const("number"))
+    assert dispatch(int) == "number"
+    assert dispatch(str) == "object"
+    assert dispatch(bool) == "number"
+
+    dispatch.insert((int,), const("int"))
+    # only the resolutions for subclasses of int were dropped
+    assert set(dispatch._cache) == {(str,)}
+    assert dispatch(int) == "int"
+    assert dispatch(bool) == "int"
+    assert dispatch(str) == "object"
+
+    dispatch.insert((object,), const("any"))
+    assert (str,) in dispatch._cache
+    assert dispatch(str) == "any"
+
+
+def test_export_and_load_resolutions(tmp_path):
+    def make_dispatch():
+        dispatch = GenericTypeLevelDispatch("snapshot")
+        dispatch.insert((object,), const("object"))
+        dispatch.insert((typing.Collection,), const("collection"))
+        dispatch.insert((typing.Mapping,), const("mapping"))
+        return dispatch
+
+    class Local(dict):
+        pass
+
+    dispatch = make_dispatch()
+    types = [
+        int,
+        typing.List[int],
+        typing.Dict[str, typing.Tuple[int, ...]],
+        typing.Optional[str],
+        typing.Callable[[int], str],
+        Local,
+    ]
+    expected = [dispatch(t) for t in types]
+    path = str(tmp_path / "resolutions.json")
+    # the local class isn't importable by path
+    assert dispatch.freeze(path) == len(types) - 1
+
+    fresh = make_dispatch()
+    assert fresh.load_resolutions(path) == len(types) - 1
+    assert fresh.cache_info().currsize == len(types) - 1
+    assert [fresh(t) for t in types] == expected
+    assert fresh.cache_info().misses == 1
+
+    changed = make_dispatch()
+    changed.insert((typing.Sequence,), const("sequence"))
+    with pytest.warns(UserWarning, match="registered signatures"):
+        assert changed.load_resolutions(path) == 0
+    assert changed(typing.List[int]) == "sequence"
+
+
+def test_compiled_dispatch():
+    dispatch = GenericTypeLevelSingleDispatch("compiled")
+    dispatch.register(object)(lambda t, *args: ("object", t, args))
+    dispatch.register(typing.Mapping)(lambda t, *args: ("mapping", t, args))
+    types = [int, typing.Dict[str, int], typing.List[int]]
+    expected = [dispatch(t) for t in types]
+
+    compiled = dispatch.compile()
+    assert [compiled(t) for t in types] == expected
+    # new types take the slow path
+    assert compiled(typing.Mapping[int, str]) == dispatch(typing.Mapping[int, str])
+    assert _args_key(typing.Mapping[int, str]) in dispatch._compiled
+
+    dispatch.register(typing.Collection)(lambda t, *args: ("collection", t, args))
+    assert compiled(typing.List[int])[0] == "collection"
+    assert compiled(typing.List[int]) == dispatch(typing.List[int])
+    assert compiled(typing.Dict[str, int]) == expected[1]
+
+
+def test_compiled_multiple_dispatch():
+    compiled = pair_dispatch.compile()
+    for sig in [(int, object), (str, typing.List[int]), (object, object)]:
+        assert compiled(*sig) == pair_dispatch(*sig)
+        assert sig in pair_dispatch._compiled
+
+
+def test_single_dispatch_caches_resolved_args():
+    dispatch = GenericTypeLevelSingleDispatch("args_cache")
+    dispatch.register(object)(lambda t, *args: ("object", t, args))
+    dispatch.register(typing.Mapping)(lambda t, *args: ("mapping", t, args))
+    t = typing.Dict[str, int]
+    result = dispatch(t)
+    assert result[0] == "mapping"
+    assert dispatch._args_cache[intern_type(t, ordered=True)][1:] == result[1:]
+    assert dispatch(int) == ("object", int, ())
+    assert dispatch(t) == result
+
+    # late registration drops only the affected entries
+    dispatch.register(typing.Dict)(lambda t, *args: ("dict", t, args))
+    assert set(dispatch._args_cache) == {int}
+    assert dispatch(t) == ("dict", typing.Dict, (str, int))
+    assert dispatch._args_cache[intern_type(t, ordered=True)][1:] == (typing.Dict, (str, int))
+
+    dispatch.cache_clear()
+    assert not dispatch._args_cache
+
+
+def test_single_dispatch_passes_union_args_in_order():
+    dispatch = GenericTypeLevelSingleDispatch("union_args")
+    dispatch.register(typing.Union)(lambda t, *args: args)
+    assert dispatch(typing.Union[int, str]) == (int, str)
+    assert dispatch(typing.Union[str, int]) == (str, int)
+    assert dispatch(typing.Union[int, str]) == (int, str)
+    assert dispatch(typing.Optional[int]) == (int, type(None))
+    assert dispatch(typing.Union[None, int]) == (type(None), int)
+
+
+def test_register_incomparable_signatures():
+    UserId = typing.NewType("UserId", int)
+    dispatch = GenericTypeLevelSingleDispatch("incomparable")
+    types = [object, int, UserId, typing.Literal["a", "b"], typing.Mapping]
+    for t in types:
+        dispatch.register(t, as_const=True)(str(t))
+    for t in types[1:]:
+        assert dispatch(t) == str(t)
+
+
+def test_package_version_of_distributions_and_sources(tmp_path, monkeypatch):
+    from bourbaki.introspection.generic_dispatch import _package_version
+
+    pytest.importorskip("yaml")
+    assert _package_version("yaml").startswith("PyYAML==")
+
+    package = tmp_path / "snapshot_app"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    version = _package_version("snapshot_app")
+    assert version.startswith("files:")
+    assert _package_version("snapshot_app") == version
+    (package / "models.py").write_text("class Model: pass\n")
+    assert _package_version("snapshot_app") != version
+
+
+def test_late_registration_drops_args_for_all_union_orderings():
+    dispatch = GenericTypeLevelSingleDispatch("union_orderings")
+    dispatch.register(typing.Union)(lambda t, *args: ("union", args))
+    assert dispatch(typing.Union[int, str]) == ("union", (int, str))
+    assert dispatch(typing.Union[str, int]) == ("union", (str, int))
+
+    dispatch.register(typing.Union[int, str])(lambda t, *args: ("int|str", args))
+    assert dispatch(typing.Union[str, int]) == ("int|str", (str, int))
+    assert dispatch(typing.Union[int, str]) == ("int|str", (int, str))
+
+    # replacing the function
+    dispatch.register(typing.Union[int, str])(lambda t, *args: ("str|int", args))
+    assert dispatch(typing.Union[int, str]) == ("str|int", (int, str))
+    assert dispatch(typing.Union[str, int]) == ("str|int", (str, int))
+
+
+def test_compiled_dispatch_passes_union_args_in_order():
+    dispatch = GenericTypeLevelSingleDispatch("compiled_union_args")
+    dispatch.register(typing.Union)(lambda t, *args: args)
+    types = [typing.Union[int, str], typing.Union[str, int], typing.Optional[int]]
+    assert dispatch(types[0]) == (int, str)
+    compiled = dispatch.compile()
+    for t in types + types:
+        assert compiled(t) == dispatch(t) == typing.get_args(t)
+
+    dispatch.register(typing.Union[int, str])(lambda t, *args: ("int|str", args))
+    for t in types[:2]:
+        assert compiled(t) == dispatch(t) == ("int|str", typing.get_args(t))
@@ -1,5 +1,7 @@
 # coding:utf-8
 from typing import *
+import importlib
+import sys
 import pathlib
 import re
 import site
@@ -10,10 +12,16 @@ from bourbaki.introspection.imports import (
     import_type,
     module_from,
     lazy_imports,
+    lazy_module,
+    LazyModule,
     import_,
     from_,
     get_globals,
+    _parse_type_tree_expr,
+    _classpath_cache,
+    invalidate_import_caches,
 )
+from bourbaki.introspection.types import issubclass_generic
 
 try:
     site_packages = site.getsitepackages()[0]
@@ -79,6 +87,54 @@ def test_lazy_imports():
     assert uuid.uuid4 is uuidfour
 
 
+@lazy_imports(from_("fractions").import_("Fraction"))
+def make_fraction_lazily(n, d):
+    return Fraction(n, d)
+
+
+class LazyMethods:
+    @lazy_imports(from_("decimal").import_("Decimal"))
+    def decimal(self, s):
+        return Decimal(s)
+
+
+def test_lazy_imports_unwrap_after_first_call():
+    wrapper = make_fraction_lazily
+    assert not wrapper.__called__
+    assert make_fraction_lazily(1, 2) == 0.5
+    # the wrapper has removed itself from the call path
+    assert make_fraction_lazily is wrapper.__wrapped__
+    assert wrapper(1, 4) == 0.25
+
+    method = vars(LazyMethods)["decimal"]
+    assert str(LazyMethods().decimal("1.5")) == "1.5"
+    # the class attribute is replaced on the next lookup
+    assert str(LazyMethods().decimal("2.5")) == "2.5"
+    assert vars(LazyMethods)["decimal"] is method.__wrapped__
+
+
+def test_lazy_module():
+    name = "bourbaki.introspection.tests_lazy_module_target"
+    assert name not in sys.modules
+    mod = lazy_module(name)
+    assert isinstance(mod, LazyModule)
+    assert name in repr(mod) and name not in sys.modules
+    # the module doesn't exist; the import is only attempted on attribute access
+    with pytest.raises(ImportError):
+        mod.foo
+
+    import fractions
+
+    assert lazy_module("fractions") is fractions
+
+    mod = LazyModule("fractions")
+    assert mod.Fraction is fractions.Fraction
+    assert "Fraction" in dir(mod)
+    assert repr(mod) == repr(fractions)
+    for attr in "__doc__", "__spec__", "__loader__", "__package__", "__file__":
+        assert getattr(LazyModule("fractions"), attr) is getattr(fractions, attr)
+
+
 @pytest.mark.parametrize(
     "path,o,dir_",
     [
@@ -112,6 +168,48 @@ def test_import_object_raises_import_error(path):
         obj = import_object(path)
 
 
+@pytest.mark.parametrize(
+    "path,o",
+    [
+        ("collections.OrderedDict", __import__("collections").OrderedDict),
+        ("re.compile", re.compile),
+        ("bourbaki.introspection.types.issubclass_generic", issubclass_generic),
+        ("int.__add__", int.__add__),
+    ],
+)
+def test_import_object_caches_resolution(path, o):
+    assert import_object(path) is o
+    hits = _classpath_cache.hits
+    assert import_object(path) is o
+    assert _classpath_cache.hits == hits + 1
+
+
+def test_import_object_negative_cache_revalidation(tmp_path):
+    package = tmp_path / "late_package"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        with pytest.raises(AttributeError):
+            import_object("late_package.late_module.value")
+        assert "late_package.late_module" in _classpath_cache.non_modules
+
+        with pytest.raises(AttributeError):
+            import_object("late_package.late_module.value")
+
+        # no need to invalidate caches; the package directory has changed
+        (package / "late_module.py").write_text("value = 1")
+        assert import_object("late_package.late_module.value") == 1
+        assert importlib.import_module("late_package.late_module").value == 1
+
+        invalidate_import_caches()
+        assert not _classpath_cache.non_modules
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop("late_package.late_module", None)
+        sys.modules.pop("late_package", None)
+
+
 @pytest.mark.parametrize(
     "path,t",
     [
@@ -125,6 +223,7 @@ def test_import_object_raises_import_error(path):
             Dict[Tuple[int, str, bool], Sequence[complex]],
         ),
         ("Union[int,complex,float]", Union[int, complex, float]),
+        ("typing.Tuple[()]", Tuple),
     ],
 )
 def test_import_type(path, t):
@@ -138,6 +237,49 @@ def test_import_type_raises_syntax_error(path):
         type_ = import_type(path)
 
 
+@pytest.mark.parametrize(
+    "expr,tree",
+    [
+        ("List[int]", ("List", "int")),
+        ("Tuple[int, ...]", ("Tuple", "int", "...")),
+        (
+            "typing.Dict[str, mypkg.models.User]",
+            ("typing.Dict", "str", "mypkg.models.User"),
+        ),
+        (" Dict [ str , List[ int ], ] ", ("Dict", "str", ("List", "int"))),
+        ("typing . Mapping[str, int]", ("typing.Mapping", "str", "int")),
+        ("Callable[..., Set[int]]", ("Callable", "...", ("Set", "int"))),
+        ("typing.Tuple[()]", ("typing.Tuple",)),
+        ("Tuple[ ( ) ]", ("Tuple",)),
+        ("Tuple[(int, str)]", ("Tuple", "int", "str")),
+        ("List[(int)]", ("List", "int")),
+    ],
+)
+def test_parse_type_tree_expr(expr, tree):
+    assert _parse_type_tree_expr(expr) == tree
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "List[]",
+        "List[int",
+        "List[int]]",
+        "List[int][str]",
+        "Dict[str,,int]",
+        "...",
+        "None",
+        "List[1]",
+        "List[()",
+        "List[(int), str]",
+        "(int)",
+    ],
+)
+def test_parse_type_tree_expr_raises_syntax_error(expr):
+    with pytest.raises(SyntaxError):
+        _parse_type_tree_expr(expr)
+
+
 @pytest.mark.parametrize("path", ["re.I", "pathlib", "int.__str__"])
 def test_import_type_fails_for_non_type(path):
     with pytest.raises(TypeError):
@@ -166,3 +308,82 @@ def test_import_module(path, mod, dir_):
 def test_import_module_raises_on_non_module(path):
     with pytest.raises(ModuleNotFoundError):
         mod = module_from(path)
+
+
+def test_module_from_source_dir(tmp_path, monkeypatch):
+    pkg = tmp_path / "_sourcepath_pkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "sub.py").write_text("from _sourcepath_sibling import X\n")
+    (tmp_path / "_sourcepath_sibling.py").write_text("X = object()\n")
+
+    def chdir(path):
+        raise AssertionError("chdir({!r})".format(path))
+
+    monkeypatch.setattr("os.chdir", chdir)
+    try:
+        with pytest.raises(ModuleNotFoundError):
+            module_from("_sourcepath_pkg.sub")
+        with pytest.raises(ModuleNotFoundError):
+            object_from("_sourcepath_pkg.sub.X")
+        sub = module_from("_sourcepath_pkg.sub", str(tmp_path))
+        assert sub.X is sys.modules["_sourcepath_sibling"].X
+        assert sub.__file__ == str(pkg / "sub.py")
+        assert object_from("_sourcepath_pkg.sub.X", str(tmp_path)) is sub.X
+        # also taking the directory from the path
+        assert module_from(str(tmp_path / "_sourcepath_sibling")).X is sub.X
+    finally:
+        for name in "_sourcepath_pkg", "_sourcepath_pkg.sub", "_sourcepath_sibling":
+            sys.modules.pop(name, None)
+
+
+def test_module_from_source_dir_doesnt_shadow_builtins(tmp_path):
+    from bourbaki.introspection.imports import _sourcepath_finder
+
+    meta_path = sys.meta_path
+    assert meta_path.index(importlib.machinery.BuiltinImporter) < meta_path.index(
+        _sourcepath_finder
+    )
+    assert meta_path.index(importlib.machinery.FrozenImporter) < meta_path.index(
+        _sourcepath_finder
+    )
+    names = [n for n in sys.builtin_module_names if n not in sys.modules]
+    if not names:
+        pytest.skip("all builtin modules are already imported")
+    name = names[0]
+    (tmp_path / (name + ".py")).write_text("shadowed = True\n")
+    mod = module_from(name, str(tmp_path))
+    assert mod.__spec__.origin == "built-in"
+    assert not hasattr(mod, "shadowed")
+
+
+def test_module_from_sees_replaced_sources(tmp_path):
+    name = "_sourcepath_replaced"
+    (tmp_path / (name + ".py")).write_text("kind = 'module'\n")
+    try:
+        assert module_from(name, str(tmp_path)).kind == "module"
+        del sys.modules[name]
+        (tmp_path / (name + ".py")).unlink()
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "__init__.py").write_text("kind = 'package'\n")
+        assert module_from(name, str(tmp_path)).kind == "package"
+    finally:
+        sys.modules.pop(name, None)
+
+
+def test_module_from_bounds_directory_finders(tmp_path):
+    from bourbaki.introspection.imports import _sourcepath_finder
+
+    maxsize = _sourcepath_finder.maxsize
+    _sourcepath_finder.resize(4)
+    try:
+        for i in range(8):
+            dir_ = tmp_path / str(i)
+            dir_.mkdir()
+            with pytest.raises(ModuleNotFoundError):
+                module_from("_sourcepath_missing", str(dir_))
+        assert list(_sourcepath_finder.finders) == [
+            str(tmp_path / str(i)) for i in range(4, 8)
+        ]
+    finally:
+        _sourcepath_finder.resize(maxsize)
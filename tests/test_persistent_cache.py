@@ -0,0 +1,123 @@
+# coding:utf-8
+import importlib
+import os
+import sys
+import typing
+import numbers
+import pytest
+from bourbaki.introspection.caches import clear_caches
+from bourbaki.introspection.persistent_cache import (
+    enable_persistent_subtype_cache,
+    disable_persistent_subtype_cache,
+)
+from bourbaki.introspection.types import issubclass_generic
+
+MODULE_SOURCE = """
+import typing
+from persisted_bases import Base
+
+class Record(typing.Mapping):
+    pass
+
+class Derived(Base):
+    pass
+
+class Square:
+    pass
+"""
+
+BASES_SOURCE = """
+import abc
+
+class Base:
+    pass
+
+class Shape(abc.ABC):
+    pass
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    module_path = tmp_path / "persisted_types.py"
+    module_path.write_text(MODULE_SOURCE)
+    (tmp_path / "persisted_bases.py").write_text(BASES_SOURCE)
+    sys.path.insert(0, str(tmp_path))
+    yield str(tmp_path / "subtypes.db")
+    disable_persistent_subtype_cache()
+    issubclass_generic.cache_clear()
+    sys.path.remove(str(tmp_path))
+    sys.modules.pop("persisted_types", None)
+    sys.modules.pop("persisted_bases", None)
+
+
+def query(pairs):
+    # start from empty in-memory caches, as a fresh process would
+    clear_caches()
+    return [issubclass_generic(t1, t2) for t1, t2 in pairs]
+
+
+def test_persistent_subtype_cache_shared(db_path):
+    record = importlib.import_module("persisted_types").Record
+    pairs = [
+        (int, numbers.Number),
+        (typing.List[int], typing.Sequence[numbers.Real]),
+        (typing.Dict[str, int], typing.Collection[str]),
+        (record, typing.Mapping),
+        (str, record),
+    ]
+    cache = enable_persistent_subtype_cache(db_path)
+    expected = query(pairs)
+    assert cache.misses >= len(pairs) and cache.hits == 0
+    disable_persistent_subtype_cache()
+
+    cache = enable_persistent_subtype_cache(db_path)
+    assert query(pairs) == expected
+    assert (cache.hits, cache.misses) == (len(pairs), 0)
+
+    # entries involving a changed module are recomputed
+    stat = os.stat(sys.modules["persisted_types"].__file__)
+    os.utime(
+        sys.modules["persisted_types"].__file__,
+        ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9),
+    )
+    cache = enable_persistent_subtype_cache(db_path)
+    assert query(pairs) == expected
+    assert (cache.hits, cache.misses) == (len(pairs) - 2, 2)
+
+
+def test_persistent_subtype_cache_skips_unimportable_types(db_path):
+    class Local(dict):
+        pass
+
+    cache = enable_persistent_subtype_cache(db_path)
+    assert query([(Local, typing.Mapping), (Local, int)]) == [True, False]
+    assert cache.hits == cache.misses == 0
+
+
+def touch(module):
+    path = sys.modules[module].__file__
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_persistent_subtype_cache_tracks_bases_and_registrations(db_path):
+    types = importlib.import_module("persisted_types")
+    bases = importlib.import_module("persisted_bases")
+    pairs = [(types.Derived, bases.Base), (types.Square, bases.Shape)]
+    enable_persistent_subtype_cache(db_path)
+    assert query(pairs) == [True, False]
+    disable_persistent_subtype_cache()
+
+    # a change to a base class's module invalidates entries for its subclasses
+    touch("persisted_bases")
+    cache = enable_persistent_subtype_cache(db_path)
+    assert query(pairs[:1]) == [True]
+    assert (cache.hits, cache.misses) == (0, 1)
+    disable_persistent_subtype_cache()
+
+    # as does a registration on an ABC involved
+    bases.Shape.register(types.Square)
+    cache = enable_persistent_subtype_cache(db_path)
+    assert query(pairs) == [True, True]
+    assert (cache.hits, cache.misses) == (1, 1)
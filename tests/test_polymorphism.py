@@ -1,10 +1,17 @@
 from numbers import Real
-from bourbaki.introspection.polymorphism import SingleValueDispatch
+import gc
+import weakref
+from bourbaki.introspection.polymorphism import (
+    SingleValueDispatch,
+    MultipleDispatchMethod,
+)
+from bourbaki.introspection.caches import clear_caches, registered_caches
 
 import pytest
 
 func = SingleValueDispatch("func")
 
+
 # fallback
 @func.register(lambda x: True)
 def identity(x):
@@ -40,3 +47,122 @@ def test_single_value_dipatch(i, o):
     r = func(i)
     assert type(r) is type(o)
     assert r == o
+
+
+def make_keyed_dispatch(key=type):
+    calls = []
+    keyed = SingleValueDispatch("keyed", key=key)
+
+    @keyed.register(lambda x: True)
+    def fallback(x):
+        return "fallback"
+
+    def typename(x):
+        calls.append(x)
+        return type(x).__name__
+
+    keyed.register_fork({"str": lambda x: "str", "int": lambda x: "int"})(typename)
+    # consecutive forks on the same predicate merge; the later mapping takes precedence
+    keyed.register_fork({"int": lambda x: "int!", "bytes": lambda x: "bytes"})(typename)
+    return keyed, calls
+
+
+@pytest.mark.parametrize(
+    "values,outputs",
+    [
+        ((1, 2, 3), ("int!", "int!", "int!")),
+        (("a", b"b", "c", b"d"), ("str", "bytes", "str", "bytes")),
+        ((1.0, [1], 2.0), ("fallback", "fallback", "fallback")),
+    ],
+)
+def test_single_value_dispatch_memoizes_by_key(values, outputs):
+    keyed, calls = make_keyed_dispatch()
+    assert len(keyed.funcs) == 2
+    assert tuple(map(keyed, values)) == outputs
+    assert len(calls) == len(set(map(type, values)))
+    assert keyed.cache_info().hits == len(values) - len(calls)
+    assert sum(s.fired for s in keyed.stats()) == len(values)
+
+
+def test_single_value_dispatch_registration_invalidates_memo():
+    keyed, calls = make_keyed_dispatch()
+    assert keyed(1.0) == "fallback"
+    keyed.register(lambda x: isinstance(x, float))(lambda x: "float")
+    assert keyed(1.0) == "float"
+    assert [s.fired for s in keyed.stats()] == [1, 0, 1]
+
+
+def test_single_value_dispatch_stats():
+    for i in [1, 1.0, True, 3 + 4j, "foo", []]:
+        func(i)
+    stats = func.stats()
+    assert [s.predicate for s in stats] == [p for p, _, _ in reversed(func.funcs)]
+    assert stats[1].predicate is typename
+    assert all(s.fired > 0 for s in stats)
+
+
+class Shape:
+    area = MultipleDispatchMethod("area")
+    area.add((int,), "_area_int")
+    area.add((str,), "_area_str")
+
+    def _area_int(self, x):
+        return x * x
+
+    def _area_str(self, x):
+        return len(x)
+
+
+@pytest.mark.parametrize("arg,area", [(3, 9), ("abc", 3)])
+def test_multiple_dispatch_method(arg, area):
+    assert Shape().area(arg) == area
+
+    class Sub(Shape):
+        def _area_int(self, x):
+            return -x
+
+    assert Sub().area(arg) == (-arg if isinstance(arg, int) else area)
+
+
+def test_multiple_dispatch_method_rebuilds_when_methods_added():
+    class Local(Shape):
+        area = MultipleDispatchMethod("area")
+        area.add((int,), "_area_int")
+
+        def _area_float(self, x):
+            return x / 2
+
+    assert Local().area(2) == 4
+    with pytest.raises(NotImplementedError):
+        Local().area(2.0)
+    vars(Local)["area"].add((float,), "_area_float")
+    assert Local().area(2.0) == 1.0
+
+
+def test_multiple_dispatch_method_releases_dynamic_subclasses():
+    refs = []
+    for i in range(8):
+        tenant = type("Tenant{}".format(i), (Shape,), {})
+        assert tenant().area(2) == 4
+        refs.append(weakref.ref(tenant))
+        del tenant
+    gc.collect()
+    assert all(r() is None for r in refs)
+
+
+def test_multiple_dispatch_method_tables_are_registered_caches():
+    class Local(Shape):
+        pass
+
+    area = vars(Shape)["area"]
+    table = area.bind_class(Local)
+    assert area.bind_class(Local) is table
+    assert Local in area.cache_mappings()[0]
+    assert area.cache_info().currsize >= 1
+    assert any(cache is area for _, cache in registered_caches())
+
+    clear_caches()
+    assert area.cache_info().currsize == 0
+    rebound = area.bind_class(Local)
+    assert rebound is not table
+    assert Local().area(3) == 9
@@ -0,0 +1,190 @@
+# coding:utf-8
+import sys
+import time
+import typing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import pytest
+from bourbaki.introspection.caches import weak_lru_cache
+from bourbaki.introspection.generic_dispatch import GenericTypeLevelSingleDispatch
+from bourbaki.introspection.imports import lazy_imports, from_, object_from
+from bourbaki.introspection.typechecking import isinstance_generic
+from bourbaki.introspection.wrappers import cached_getter
+
+N_THREADS = 16
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    # switch threads as often as possible to provoke races
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run_concurrently(f, args):
+    with ThreadPoolExecutor(N_THREADS) as pool:
+        return list(pool.map(f, args))
+
+
+class CallCounter:
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = Lock()
+
+    def __call__(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+
+def test_weak_lru_cache_computes_once_per_key():
+    calls = CallCounter()
+
+    @weak_lru_cache(maxsize=None)
+    def slow_square(x):
+        calls(x)
+        time.sleep(0.005)
+        return x * x
+
+    keys = list(range(8)) * 32
+    assert run_concurrently(slow_square, keys) == [x * x for x in keys]
+    assert calls.counts == Counter(range(8))
+    assert len(slow_square) == 8
+
+
+def test_weak_lru_cache_bounded_under_contention():
+    @weak_lru_cache(maxsize=16)
+    def f(x):
+        return -x
+
+    keys = list(range(64)) * 16
+    assert run_concurrently(f, keys) == [-x for x in keys]
+    assert len(f) <= 16
+
+
+types = [
+    int,
+    str,
+    float,
+    typing.List[int],
+    typing.Dict[str, int],
+    typing.Mapping[str, typing.List[int]],
+    typing.Tuple[int, ...],
+    typing.Tuple[int, str],
+    typing.Union[int, str],
+    typing.Collection[float],
+]
+
+
+def make_dispatch():
+    dispatch = GenericTypeLevelSingleDispatch("threads")
+    dispatch.register(object)(lambda t, *args: ("object", t, args))
+    dispatch.register(typing.Collection)(lambda t, *args: ("collection", t, args))
+    return dispatch
+
+
+def test_dispatch_resolves_once_per_type():
+    dispatch = make_dispatch()
+    expected = [make_dispatch()(t) for t in types]
+    ts = types * 32
+    assert run_concurrently(dispatch, ts) == expected * 32
+    assert dispatch.cache_info().misses == len(types)
+
+    compiled = dispatch.compile()
+    assert run_concurrently(compiled, ts) == expected * 32
+
+
+def test_dispatch_concurrent_with_registration():
+    dispatch = make_dispatch()
+    late = [typing.Mapping, typing.Sequence, typing.Tuple, str]
+
+    def work(i):
+        if i % 16 == 0:
+            t = late[(i // 16) % len(late)]
+            dispatch.register(t)(lambda t_, *args, name=str(t): (name, t_, args))
+        return dispatch(types[i % len(types)])
+
+    run_concurrently(work, range(len(late) * 16))
+
+    fresh = make_dispatch()
+    for t in late:
+        fresh.register(t)(lambda t_, *args, name=str(t): (name, t_, args))
+    assert [dispatch(t) for t in types] == [fresh(t) for t in types]
+
+
+values = [
+    (1, int),
+    ("a", int),
+    ([1, 2], typing.Collection[int]),
+    ([1, "2"], typing.Collection[int]),
+    ({"a": [1]}, typing.Mapping[str, typing.Collection[int]]),
+    ({"a": ["b"]}, typing.Mapping[str, typing.Collection[int]]),
+    ((1, "a"), typing.Tuple[int, str]),
+    ((1, 2, 3), typing.Tuple[int, ...]),
+    (1.5, typing.Union[int, str]),
+]
+
+
+def test_concurrent_type_checking():
+    expected = [isinstance_generic(v, t) for v, t in values]
+    results = run_concurrently(lambda vt: isinstance_generic(*vt), values * 32)
+    assert results == expected * 32
+
+
+class Lazy:
+    calls = CallCounter()
+
+    @property
+    @cached_getter
+    def value(self):
+        self.calls(id(self))
+        time.sleep(0.005)
+        return object()
+
+
+def test_cached_getter_computes_once():
+    objs = [Lazy() for _ in range(4)]
+    results = run_concurrently(lambda o: o.value, objs * 16)
+    assert all(r is o.value for r, o in zip(results, objs * 16))
+    assert set(Lazy.calls.counts.values()) == {1}
+
+
+@lazy_imports(from_("fractions").import_("Fraction"))
+def make_fraction(i):
+    return Fraction(i, 3)
+
+
+def test_lazy_imports_concurrent_first_call():
+    wrapper = make_fraction
+    assert not wrapper.__called__
+    results = run_concurrently(wrapper, range(64))
+    assert results == [make_fraction(i) for i in range(64)]
+    assert wrapper.__called__
+    # the module-level name now refers to the wrapped function
+    assert make_fraction is wrapper.__wrapped__
+
+
+def test_object_from_many_source_dirs_concurrently(tmp_path):
+    names = ["_sourcepath_model_{}".format(i) for i in range(32)]
+    for i, name in enumerate(names):
+        dir_ = tmp_path / str(i)
+        dir_.mkdir()
+        # each module also imports a sibling module of the same name from its own directory
+        (dir_ / "{}_helper.py".format(name)).write_text("VALUE = {}\n".format(i))
+        (dir_ / "{}.py".format(name)).write_text(
+            "from {}_helper import VALUE\n\nclass Model:\n    value = VALUE\n".format(
+                name
+            )
+        )
+
+    def load(i):
+        return object_from(names[i] + ".Model", str(tmp_path / str(i))).value
+
+    try:
+        assert run_concurrently(load, range(len(names))) == list(range(len(names)))
+    finally:
+        for name in names:
+            sys.modules.pop(name, None)
+            sys.modules.pop(name + "_helper", None)
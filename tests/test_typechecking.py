@@ -1,11 +1,17 @@
 # coding:utf-8
 from typing import *
 from typing import Pattern, Match, ChainMap, Counter, Collection, TypeVar, Generic
+import random
 import types
 import pytest
-from numbers import Number, Integral
+from array import array
+from numbers import Number, Integral, Real
 
-from bourbaki.introspection.typechecking import isinstance_generic
+from bourbaki.introspection.typechecking import (
+    isinstance_generic,
+    isinstance_generic_many,
+    isinstance_generic_iter,
+)
 
 T_co = TypeVar("T", covariant=True)
 
@@ -104,3 +110,223 @@ def test_callable_typechecker_neg(f, t):
 )
 def test_type_typechecker_pos(type_, t):
     assert isinstance_generic(type_, t)
+
+
+NestedPayload = Collection[Mapping[str, Tuple[int, float]]]
+
+
+@pytest.mark.parametrize(
+    "value,t",
+    [
+        ([{"a": (1, 2.0), "b": (3, 4.0)}], NestedPayload),
+        ([{"a": (1, 2)}], NestedPayload),
+        ([{1: (1, 2.0)}], NestedPayload),
+        ({"a": (1, 2.0)}, NestedPayload),
+        ([], NestedPayload),
+        ([1, "a"], Collection[Union[int, str]]),
+        ([1, b"a"], Collection[Union[int, str]]),
+        ((1, 2, 3), Tuple[int, ...]),
+        ((1, 2, 3.0), Tuple[int, ...]),
+        ((1, "a"), Tuple[int, str]),
+        ({(1, "a"): [1, 2]}, Mapping[Tuple[int, str], Collection[int]]),
+        ({(1, 2): [1, 2]}, Mapping[Tuple[int, str], Collection[int]]),
+        ("abc", Union[int, Collection[str]]),
+        (3.0, Union[int, Collection[str]]),
+        ([object()], Collection[Any]),
+        ({1: 2}, Mapping[Any, int]),
+        ({1: "2"}, Mapping[int, Any]),
+        ([f, g, 1], Collection[Callable]),
+        ([int, bool], Collection[Type[Number]]),
+        ([int, str], Collection[Type[Number]]),
+    ],
+)
+def test_compiled_type_checker_agrees(value, t):
+    assert isinstance_generic(value, t, compiled=True) is isinstance_generic(value, t)
+
+
+@pytest.mark.parametrize(
+    "value,t",
+    [
+        ((1, 2, 3), Tuple[int, str]),
+        ([(1, 2, 3)], Collection[Tuple[int, int]]),
+        ({"a": (1,)}, Mapping[int, Tuple[int, int]]),
+    ],
+)
+def test_compiled_type_checker_raises(value, t):
+    with pytest.raises(ValueError):
+        isinstance_generic(value, t)
+    with pytest.raises(ValueError):
+        isinstance_generic(value, t, compiled=True)
+
+
+class SpoofedInt:
+    __class__ = int
+
+
+@pytest.mark.parametrize(
+    "value,t,result",
+    [
+        (list(range(1000)), Collection[int], True),
+        ([*range(1000), True], Collection[int], True),
+        ([*range(1000), 1.0], Collection[int], False),
+        ([1, 2.0, 3 + 1j], Collection[Number], True),
+        ([1, "a", 2], Collection[Union[int, str]], True),
+        ([1, b"a", 2], Collection[Union[int, str]], False),
+        ([SpoofedInt()], Collection[int], True),
+        ({str(i): i for i in range(100)}, Mapping[str, int], True),
+        ({str(i): float(i) for i in range(100)}, Mapping[str, int], False),
+        ({i: i for i in range(100)}, Mapping[str, int], False),
+        ({"a": [1], "b": [2]}, Mapping[str, Collection[int]], True),
+        ({"a": [1], 1: [2]}, Mapping[str, Collection[int]], False),
+        ({"a": [1], "b": ["2"]}, Mapping[str, Collection[int]], False),
+        ({(1,): "a"}, Mapping[Tuple[int], str], True),
+        ({(1,): 1}, Mapping[Tuple[int], str], False),
+        ({SpoofedInt(): 1}, Mapping[int, int], True),
+    ],
+)
+def test_homogeneous_collection_checks(value, t, result):
+    assert isinstance_generic(value, t) is result
+    assert isinstance_generic(value, t, compiled=True) is result
+
+
+@pytest.mark.parametrize(
+    "value,t,max_elements,result",
+    [
+        ([*range(100), "x"], Collection[int], 100, True),
+        ([*range(100), "x"], Collection[int], 101, False),
+        (["x", *range(100)], Collection[int], 1, False),
+        ((*range(10), "x"), Tuple[int, ...], 10, True),
+        ((*range(10), "x"), Tuple[int, ...], 11, False),
+        ({"a": 1, 1: 1}, Mapping[str, int], 1, True),
+        ({"a": 1, 1: 1}, Mapping[str, int], 2, False),
+        ({"a": [1, "b"]}, Mapping[str, Collection[int]], 1, True),
+        ({"a": ["b", 1]}, Mapping[str, Collection[int]], 1, False),
+        ([[1, 2, "a"]], Collection[Collection[int]], {Mapping: 1}, False),
+        ([[1, 2, "a"]], Collection[Collection[int]], {Collection: 2}, True),
+        ([1, [1, "a"]], Collection[Union[int, Collection[int]]], 10, False),
+        ([1, [1, "a"]], Collection[Union[int, Collection[int]]], 1, True),
+    ],
+)
+def test_budgeted_type_checker(value, t, max_elements, result):
+    assert isinstance_generic(value, t, max_elements=max_elements) is result
+
+
+@pytest.mark.parametrize("max_elements", [-1, {Collection: 1, Mapping: -1}])
+def test_budgeted_type_checker_rejects_negative_budgets(max_elements):
+    with pytest.raises(ValueError):
+        isinstance_generic([], Collection[int], max_elements=max_elements)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sampled_type_checker(seed):
+    rng = random.Random(seed)
+    value = [*range(1000), *map(str, range(1000))]
+    rng.shuffle(value)
+    assert (
+        isinstance_generic(value, Collection[int], max_elements=5, sample=rng) is False
+    )
+    assert isinstance_generic(
+        set(value), Collection[Union[int, str]], max_elements=5, sample=rng
+    )
+
+
+@pytest.mark.parametrize(
+    "value,t,result",
+    [
+        (array("d", range(1000)), Collection[float], True),
+        (array("d", range(1000)), Collection[int], False),
+        (array("q", range(1000)), Collection[int], True),
+        (array("q", range(1000)), Collection[Number], True),
+        (array("q", range(1000)), Collection[Union[str, float]], False),
+        (array("q"), Collection[str], True),
+        (array("u", "abc"), Collection[str], True),
+        (memoryview(b"abc"), Collection[int], True),
+        (memoryview(b"abc").cast("c"), Collection[bytes], True),
+        (memoryview(b"abc").cast("c"), Collection[int], False),
+        (memoryview(array("f", [1.0, 2.0])), Collection[float], True),
+        (memoryview(array("f", [1.0, 2.0])), Collection[int], False),
+        ([array("d", [1.0]), array("d", [2.0])], Collection[Collection[float]], True),
+        ([array("d", [1.0]), array("i", [2])], Collection[Collection[float]], False),
+    ],
+)
+def test_typed_buffer_checks(value, t, result):
+    assert isinstance_generic(value, t) is result
+    assert isinstance_generic(value, t, compiled=True) is result
+    assert isinstance_generic(list(value), t) is result
+
+
+@pytest.mark.parametrize(
+    "dtype,t,result",
+    [
+        ("float64", Collection[float], True),
+        ("float64", Collection[Real], True),
+        ("float32", Collection[float], False),
+        ("int64", Collection[int], False),
+        ("int64", Collection[Integral], True),
+        ("bool", Collection[Number], False),
+        ("object", Collection[int], True),
+        ("object", Collection[float], False),
+    ],
+)
+def test_ndarray_checks(dtype, t, result):
+    np = pytest.importorskip("numpy")
+    value = np.arange(1000).astype(dtype)
+    assert isinstance_generic(value, t) is result
+    assert isinstance_generic(value, t, compiled=True) is result
+    assert isinstance_generic(list(value), t) is result
+    assert isinstance_generic(value.reshape(10, 100), Collection[t]) is result
+
+
+batch_values = [[1], [1, "a"], "x", [], (2, 3), {4: 5}, None]
+batch_results = [True, False, False, True, True, True, False]
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_isinstance_generic_many(compiled):
+    t = Collection[int]
+    assert isinstance_generic_many(batch_values, t, compiled=compiled) == batch_results
+    assert isinstance_generic_many(
+        batch_values, t, failures=True, compiled=compiled
+    ) == [i for i, ok in enumerate(batch_results) if not ok]
+
+
+@pytest.mark.parametrize("chunksize", [None, 1, 3, 100])
+def test_isinstance_generic_iter(chunksize):
+    t = Collection[int]
+    results = list(isinstance_generic_iter(iter(batch_values), t, chunksize=chunksize))
+    failures = list(
+        isinstance_generic_iter(
+            iter(batch_values), t, failures=True, chunksize=chunksize
+        )
+    )
+    if chunksize is not None:
+        assert all(len(chunk) <= chunksize for chunk in results)
+        results = [r for chunk in results for r in chunk]
+        failures = [i for chunk in failures for i in chunk]
+    assert results == batch_results
+    assert failures == [i for i, ok in enumerate(batch_results) if not ok]
+
+
+def test_isinstance_generic_iter_fails_eagerly():
+    with pytest.raises(TypeError):
+        isinstance_generic_iter(batch_values, object())
+    for chunksize in 0, -1:
+        with pytest.raises(ValueError):
+            isinstance_generic_iter(batch_values, Collection[int], chunksize=chunksize)
+
+
+def test_sampled_type_checkers_share_a_tree():
+    from bourbaki.introspection.typechecking import (
+        budgeted_type_checker_for,
+        _budgeted_type_checker_for,
+    )
+
+    t = Collection[Collection[int]]
+    checkers = [budgeted_type_checker_for(t, 5, random.Random(i)) for i in range(3)]
+    assert len({id(c.args[0]) for c in checkers}) == 1
+    assert checkers[0].args[0] is _budgeted_type_checker_for(t, 5, True)
+    # the same random state gives the same sample
+    value = [[*range(100), *map(str, range(100))]] * 3
+    assert [c(value) for c in checkers] == [
+        budgeted_type_checker_for(t, 5, random.Random(i))(value) for i in range(3)
+    ]
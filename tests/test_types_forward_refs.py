@@ -0,0 +1,76 @@
+# coding:utf-8
+import collections.abc
+import importlib
+import sys
+import typing
+from typing import Dict, List, Mapping
+import pytest
+from bourbaki.introspection.types import eval_forward_refs
+from bourbaki.introspection.types.evaluation import get_globals, _forward_ref_cache
+
+
+@pytest.mark.parametrize(
+    "obj,module",
+    [
+        (collections.abc.Mapping, "collections.abc"),
+        (get_globals, "bourbaki.introspection.types.evaluation"),
+        (typing.List, "typing"),
+    ],
+)
+def test_get_globals_resolves_submodule(obj, module):
+    assert get_globals(obj)["__name__"] == module
+
+
+@pytest.mark.parametrize(
+    "t,expected",
+    [
+        ("Foo", int),
+        (typing.ForwardRef("Foo"), int),
+        (List["Foo"], List[int]),
+        ("Dict[str, Foo]", Dict[str, int]),
+        (Mapping[str, "List[Foo]"], Mapping[str, List[int]]),
+    ],
+)
+def test_eval_forward_refs_cached_per_namespace(t, expected):
+    namespace = dict(Foo=int, List=List, Dict=Dict)
+    hits = _forward_ref_cache.hits
+    assert eval_forward_refs(t, namespace) == expected
+    assert eval_forward_refs(t, namespace) == expected
+    assert _forward_ref_cache.hits > hits
+
+    # rebinding a referenced name invalidates the cached result
+    namespace["Foo"] = str
+    assert eval_forward_refs(t, namespace) == eval_forward_refs(
+        t, dict(Foo=str, List=List, Dict=Dict)
+    )
+    assert eval_forward_refs(t, dict(namespace, Foo=int)) == expected
+
+
+def test_eval_forward_refs_revalidates_attributes(tmp_path, monkeypatch):
+    (tmp_path / "forward_ref_models.py").write_text("class User:\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    mod = importlib.import_module("forward_ref_models")
+    try:
+        namespace = dict(mod=mod, List=List)
+        user = mod.User
+        assert eval_forward_refs("mod.User", namespace) is user
+        assert eval_forward_refs("List[mod.User]", namespace) == List[user]
+
+        mod.User = int
+        assert eval_forward_refs("mod.User", namespace) is int
+        assert eval_forward_refs("List[mod.User]", namespace) == List[int]
+
+        mod = importlib.reload(mod)
+        assert mod.User is not user
+        assert eval_forward_refs("mod.User", namespace) is mod.User
+        assert eval_forward_refs("List[mod.User]", namespace) == List[mod.User]
+    finally:
+        sys.modules.pop("forward_ref_models", None)
+
+
+def test_eval_forward_refs_doesnt_cache_calls():
+    calls = []
+    namespace = dict(f=lambda: calls.append(1) or int)
+    assert eval_forward_refs("f()", namespace) is int
+    assert eval_forward_refs("f()", namespace) is int
+    assert len(calls) == 2
@@ -0,0 +1,62 @@
+# coding:utf-8
+import gc
+import typing
+import weakref
+from typing import Generic, Mapping, TypeVar
+import pytest
+from bourbaki.introspection.types import (
+    generic_mro,
+    reparameterized_bases,
+    issubclass_generic,
+)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class Base(Generic[K, V]):
+    pass
+
+
+class Middle(Base[K, V], Generic[K, V]):
+    pass
+
+
+class Swapped(Middle[V, K], Generic[K, V]):
+    pass
+
+
+class Concrete(Swapped[int, str]):
+    pass
+
+
+@pytest.mark.parametrize(
+    "t,bases",
+    [
+        (Middle[int, str], [Base[int, str]]),
+        (Swapped[int, str], [Middle[str, int], Base[str, int]]),
+        (Concrete, [Swapped[int, str], Middle[str, int], Base[str, int]]),
+    ],
+)
+def test_generic_mro(t, bases):
+    mro = generic_mro(t)
+    assert type(mro) is tuple
+    assert mro == tuple(reparameterized_bases(t))
+    assert all(b in mro for b in bases)
+    assert generic_mro(t) is mro
+    assert all(issubclass_generic(t, b) for b in bases)
+
+
+def test_generic_mro_releases_classes():
+    class Local(Mapping[str, K]):
+        pass
+
+    t = Local[int]
+    assert Mapping[str, int] in generic_mro(t)
+    ref = weakref.ref(Local)
+    # typing keeps its own cache of aliases; clear it so that only ours could keep Local alive
+    for clear in typing._cleanups:
+        clear()
+    del Local, t
+    gc.collect()
+    assert ref() is None
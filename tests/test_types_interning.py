@@ -0,0 +1,104 @@
+# coding:utf-8
+import gc
+import pickle
+import typing
+import weakref
+from typing import (
+    Annotated,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    get_args,
+)
+import pytest
+from bourbaki.introspection.types import intern_type, TypeNode
+
+deep_type = Dict[
+    str, List[Tuple[int, Mapping[str, Optional[List[Dict[str, Tuple[int, ...]]]]]]]
+]
+
+
+@pytest.mark.parametrize(
+    "t1,t2",
+    [
+        (Dict[str, List[int]], Dict[str, List[int]]),
+        (
+            deep_type,
+            Dict[
+                str,
+                List[
+                    Tuple[int, Mapping[str, Optional[List[Dict[str, Tuple[int, ...]]]]]]
+                ],
+            ],
+        ),
+        (Union[int, str], Union[str, int]),
+        (int | str, str | int),
+        (Literal[1, 2], Literal[2, 1]),
+        ((Mapping, str, (List, int)), (Mapping, str, (List, int))),
+        (Callable[[int], str], Callable[[int], str]),
+    ],
+)
+def test_intern_type_equal(t1, t2):
+    node = intern_type(t1)
+    assert isinstance(node, TypeNode)
+    assert intern_type(t2) is node
+    assert hash(intern_type(t2)) == hash(node)
+    assert pickle.loads(pickle.dumps(node)) is node
+
+
+@pytest.mark.parametrize(
+    "t1,t2",
+    [
+        (List[int], list[int]),
+        (List[int], List[bool]),
+        (Literal[1], Literal[True]),
+        (Tuple[int, str], Tuple[str, int]),
+        (Callable[[int], str], Callable[[str], int]),
+        (Annotated[int, "a"], Annotated[int, "b"]),
+    ],
+)
+def test_intern_type_distinct(t1, t2):
+    assert intern_type(t1) is not intern_type(t2)
+
+
+def test_intern_type_structure():
+    node = intern_type(Dict[str, List[int]])
+    assert node.type == Dict[str, List[int]]
+    assert node.origin is Dict
+    assert node.args == (str, List[int])
+    assert node.children == (intern_type(str), intern_type(List[int]))
+
+
+def test_intern_type_releases_classes():
+    class A:
+        pass
+
+    node = intern_type(List[Tuple[A, int]])
+    ref = weakref.ref(A)
+    # typing keeps its own cache of aliases; clear it so that only the node could keep A alive
+    for clear in typing._cleanups:
+        clear()
+    del A, node
+    gc.collect()
+    assert ref() is None
+
+
+@pytest.mark.parametrize(
+    "t1,t2",
+    [
+        (Union[int, str], Union[str, int]),
+        (int | str, str | int),
+        (Literal[1, 2], Literal[2, 1]),
+    ],
+)
+def test_intern_type_ordered(t1, t2):
+    node = intern_type(t1, ordered=True)
+    assert node is intern_type(t1, ordered=True)
+    assert intern_type(t2, ordered=True) is not node
+    assert intern_type(t2, ordered=True).args == tuple(get_args(t2))
+    assert pickle.loads(pickle.dumps(node)) is node
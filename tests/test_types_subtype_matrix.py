@@ -0,0 +1,78 @@
+# coding:utf-8
+import itertools
+import numbers
+from typing import Any, Collection, Dict, List, Mapping, Sequence, Tuple, Union
+import pytest
+from bourbaki.introspection.types import SubtypeMatrix, issubclass_generic
+
+universe = [
+    object,
+    numbers.Number,
+    numbers.Real,
+    numbers.Integral,
+    int,
+    bool,
+    float,
+    str,
+    Union[int, str],
+    Collection[int],
+    Sequence[int],
+    List[int],
+    Tuple[int, ...],
+    Tuple[int, str],
+    Mapping[str, int],
+    Dict[str, int],
+    Any,
+]
+classes = [
+    object,
+    numbers.Number,
+    numbers.Real,
+    numbers.Integral,
+    int,
+    bool,
+    float,
+    str,
+]
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    return SubtypeMatrix(universe)
+
+
+@pytest.mark.parametrize("t1,t2", list(itertools.product(universe, repeat=2)))
+def test_subtype_matrix_agrees_with_issubclass_generic(matrix, t1, t2):
+    assert matrix.is_subtype(t1, t2) == issubclass_generic(t1, t2)
+
+
+@pytest.mark.parametrize("t", universe)
+def test_subtype_matrix_supertypes_subtypes(matrix, t):
+    assert matrix.supertypes(t) == [u for u in universe if issubclass_generic(t, u)]
+    assert matrix.subtypes(t) == [u for u in universe if issubclass_generic(u, t)]
+
+
+@pytest.mark.parametrize(
+    "order", [classes, classes[::-1], classes[::2] + classes[1::2]]
+)
+def test_subtype_matrix_incremental_transitive(order):
+    matrix = SubtypeMatrix(transitive=True)
+    for t in order:
+        matrix.add(t)
+    assert len(matrix) == len(classes)
+    assert matrix.add(int) == order.index(int)
+    for t1, t2 in itertools.product(classes, repeat=2):
+        assert matrix.is_subtype(t1, t2) == issubclass(t1, t2)
+
+
+def test_subtype_matrix_common_supertypes(matrix):
+    assert matrix.common_supertypes(bool, float) == [
+        object,
+        numbers.Number,
+        numbers.Real,
+        Any,
+    ]
+    assert matrix.common_supertypes() == []
+    with pytest.raises(KeyError):
+        matrix.supertypes(bytes)
+    assert bytes not in matrix and List[int] in matrix